@@ -1,22 +1,37 @@
 """LangGraph agent with OpenRouter LLM and plugin-based tools."""
 
+import asyncio
+import collections
+import contextvars
+import functools
 import hashlib
 import json
 import logging
 import os
+import re
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, NamedTuple
+
 from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import BaseTool
 from langgraph.config import get_config
 from langgraph.graph import END, START, MessagesState, StateGraph
 from langchain_openrouter import ChatOpenRouter
 
+try:  # installed with langsmith; optional, the stdlib json encoder is the fallback
+    import orjson
+except ImportError:
+    orjson = None
+
+import task_service
+import telegram_state
 from plugin_loader import load_plugins, TOOL_PLUGIN_TAGS
 
 logger = logging.getLogger("agent")
 
-_thread_local = threading.local()
-
 LLM_TIMEOUT = int(os.environ.get("LLM_TIMEOUT", "120"))  # seconds (converted to ms for SDK)
 DEFAULT_MAX_TOOL_ROUNDS = int(os.environ.get("AGENT_DEFAULT_MAX_TOOL_ROUNDS", "10"))  # normal research
 DEEP_RESEARCH_MAX_TOOL_ROUNDS = int(os.environ.get("AGENT_DEEP_MAX_TOOL_ROUNDS", "25"))  # when user asks for deep/long
@@ -29,6 +44,15 @@ TOOL_NAME_BLOCK_THRESHOLD = int(os.environ.get("TOOL_NAME_BLOCK_THRESHOLD", "7")
 TOOL_NAME_WARN_OVERRIDES = {"browser": 10}
 TOOL_NAME_BLOCK_OVERRIDES = {"browser": 20}
 TOOL_RESULT_MAX_CHARS = int(os.environ.get("TOOL_RESULT_MAX_CHARS", "15000"))
+# Research results auto-saved to memory under a URL only keep an excerpt of this size in
+# the conversation (every later LLM round re-sends it); the rest is in memory_retrieve.
+AGENT_TOOL_OBS_MAX = int(os.environ.get("AGENT_TOOL_OBS_MAX", "4000"))
+# Below this many gathered chars, the recursion-limit fallback returns the tool results as-is
+FALLBACK_SUMMARY_MIN_CHARS = int(os.environ.get("AGENT_FALLBACK_SUMMARY_MIN_CHARS", "4000"))
+# Max tool calls in flight at once within one round (read-only calls to different tools overlap)
+AGENT_TOOL_CONCURRENCY = max(1, int(os.environ.get("AGENT_TOOL_CONCURRENCY", "5")))
+# Seconds one tool call may take; tools override it with metadata["timeout"] (None = no limit)
+TOOL_TIMEOUT = float(os.environ.get("TOOL_TIMEOUT", "60"))
 
 # Effort → max tool rounds mapping
 EFFORT_ROUNDS: dict[str, int] = {
@@ -62,6 +86,36 @@ EFFORT_REASONING: dict[str, str] = {
 
 TOOLS = load_plugins()
 TOOLS_BY_NAME = {t.name: t for t in TOOLS}
+_MEMORY_ADD_TOOL = TOOLS_BY_NAME.get("memory_add")
+
+
+class _ToolEntry(NamedTuple):
+    """Everything the tool node needs about a tool, resolved once at import."""
+
+    tool: BaseTool
+    research: bool  # plugin tagged "research": results are auto-saved via memory_add
+    read_only: bool  # metadata["read_only"]: may overlap other reads; identical calls in a round run once
+    warn_limit: int  # per-name call count that adds a warning
+    block_limit: int  # per-name call count that blocks the call
+    timeout: float | None  # seconds before the call is abandoned; None = no limit
+
+
+def _tool_entry(tool: BaseTool) -> _ToolEntry:
+    metadata = tool.metadata or {}
+    return _ToolEntry(
+        tool=tool,
+        research="research" in TOOL_PLUGIN_TAGS.get(tool.name, ()),
+        read_only=bool(metadata.get("read_only")),
+        warn_limit=TOOL_NAME_WARN_OVERRIDES.get(tool.name, TOOL_NAME_WARN_THRESHOLD),
+        block_limit=TOOL_NAME_BLOCK_OVERRIDES.get(tool.name, TOOL_NAME_BLOCK_THRESHOLD),
+        timeout=metadata.get("timeout", TOOL_TIMEOUT),
+    )
+
+
+_TOOL_DISPATCH: dict[str, _ToolEntry] = {t.name: _tool_entry(t) for t in TOOLS}
+
+# Research-tool observations starting with these are errors and are not auto-saved to memory.
+_SKIP_ERROR_PREFIXES = ("Tool error", "[memory_rag ERROR]", "[browser ERROR]")
 
 SYSTEM_PROMPT_BASE = """You are a task assistant. Use available tools to look up or verify information when needed. Visit relevant URLs and summarize findings to answer the user's question.
 
@@ -125,7 +179,7 @@ Workflow for login flows:
 2. If a credential exists, use it directly in browser.type() or HTTP requests.
 3. If none exists, call ask_human once to obtain the credential, then immediately call store_credential() so future tasks can log in without asking again.
 
-Your available tools: browser (navigate, read, click, type, inspect), credential_vault (encrypted credential storage), memory_search/memory_add (RAG), update_task/create_task (task tracking), telegram_send (message user), ask_human (ask user a question), read_file/write_file/search_replace_file (project files).
+Your available tools: browser (navigate, read, click, type, inspect), browser_read_many (read several URLs in parallel), credential_vault (encrypted credential storage), memory_search/memory_add (RAG), update_task/create_task (task tracking), telegram_send (message user), ask_human (ask user a question), read_file/write_file/search_replace_file (project files).
 
 ## Rules for ask_human (STRICT):
 - ONLY ask when you genuinely cannot proceed without user input.
@@ -153,54 +207,115 @@ DEEP_RESEARCH_KEYWORDS = (
     "as many sources",
     "every relevant",
 )
+# One pass over the query for all keywords (substring match, like `kw in query.lower()`).
+_DEEP_RESEARCH_RE = re.compile("|".join(map(re.escape, DEEP_RESEARCH_KEYWORDS)), re.IGNORECASE)
 
 
 def _is_deep_research(query: str) -> bool:
     """True if the user query explicitly asks for deep/long/thorough research."""
-    q = (query or "").strip().lower()
-    return any(kw in q for kw in DEEP_RESEARCH_KEYWORDS)
+    return bool(query) and _DEEP_RESEARCH_RE.search(query) is not None
+
+
+_ORJSON_HASH_OPTS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
 
 
-def _tool_call_hash(name: str, args: dict) -> str:
-    """Deterministic hash for a tool call (name + sorted args)."""
-    payload = f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
-    return hashlib.sha256(payload.encode()).hexdigest()
+def _tool_call_hash(name: str, args: dict) -> bytes:
+    """Deterministic key for a tool call (name + sorted args); in-process dedup only."""
+    payload = None
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(args, option=_ORJSON_HASH_OPTS, default=str)
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits; the stdlib encoder handles them
+    if payload is None:
+        payload = json.dumps(args, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(name.encode() + b":" + payload, digest_size=16).digest()
 
 
-def _truncate_observation(text: str, max_chars: int = TOOL_RESULT_MAX_CHARS) -> str:
-    """Truncate tool output to avoid blowing up the context window."""
+def _truncate_observation(text: str | bytes, max_chars: int = TOOL_RESULT_MAX_CHARS) -> str:
+    """Truncate tool output to avoid blowing up the context window.
+
+    Bytes are cut before decoding, so a large binary-ish result is decoded only up to
+    the limit (the count in the marker is then in bytes).
+    """
+    if isinstance(text, bytes):
+        if len(text) <= max_chars:
+            return text.decode("utf-8", errors="replace")
+        overflow = len(text) - max_chars
+        head = text[:max_chars].decode("utf-8", errors="ignore")
+        return head + f"\n\n[... truncated {overflow:,} bytes]"
     if len(text) <= max_chars:
         return text
     overflow = len(text) - max_chars
     return text[:max_chars] + f"\n\n[... truncated {overflow:,} chars]"
 
 
+_TRANSIENT_EXC_TYPES = (TimeoutError, ConnectionError, OSError)
+_TRANSIENT_EXC_NAMES = frozenset({"ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "ConnectError"})
+# Status codes and phrases seen in retriable provider errors (substring match, like before).
+_TRANSIENT_RE = re.compile(
+    r"429|50[0234]|timeout|rate limit|connection reset|model not available|no endpoints|overloaded",
+    re.IGNORECASE,
+)
+
+
 def _is_transient_llm_error(exc: Exception) -> bool:
     """Return True if the exception looks like a transient/retriable LLM error."""
-    if isinstance(exc, (TimeoutError, ConnectionError, OSError)):
-        return True
-    name = type(exc).__name__
-    if name in ("ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "ConnectError"):
-        return True
-    s = str(exc)
-    if any(code in s for code in ("429", "500", "502", "503", "504")):
-        return True
-    if any(kw in s.lower() for kw in ("timeout", "rate limit", "connection reset",
-                                       "model not available", "no endpoints", "overloaded")):
-        return True
-    return False
+    return (
+        isinstance(exc, _TRANSIENT_EXC_TYPES)
+        or type(exc).__name__ in _TRANSIENT_EXC_NAMES
+        or _TRANSIENT_RE.search(str(exc)) is not None
+    )
+
+
+class _LLMConfig(NamedTuple):
+    """Process-wide LLM settings, read from the environment once (see refresh_config)."""
+
+    api_key: str | None
+    default_model: str
+    app_url: str
+    app_title: str
+    timeout_ms: int
+
+
+def _load_llm_config() -> _LLMConfig:
+    return _LLMConfig(
+        api_key=os.environ.get("OPENROUTER_API_KEY") or os.environ.get("OPENAI_API_KEY"),
+        default_model=os.environ.get("OPENROUTER_MODEL", "deepseek/deepseek-v3.2"),
+        app_url=os.environ.get("YOUR_SITE_URL", "https://github.com/JustinGuese/openshrimp"),
+        app_title="openShrimp",
+        timeout_ms=LLM_TIMEOUT * 1000,  # SDK expects milliseconds
+    )
+
+
+_llm_config = _load_llm_config()
+
+
+def refresh_config() -> None:
+    """Re-read LLM settings from the environment (for tests or after changing env at runtime)."""
+    global _llm_config
+    _llm_config = _load_llm_config()
+    _cached_llm.cache_clear()
+    with _bound_llms_lock:
+        _bound_llms.clear()
 
 
 def _create_llm(effort: str = "normal", model: str | None = None):
-    api_key = os.environ.get("OPENROUTER_API_KEY") or os.environ.get("OPENAI_API_KEY")
+    """Return (llm, model) for this effort; clients are cached per (effort, model)."""
+    if model is None:
+        # Per-effort model, falling back to the global default
+        model = EFFORT_MODELS.get(effort, "").strip() or _llm_config.default_model
+    return _cached_llm(effort, model), model
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_llm(effort: str, model: str):
+    cfg = _llm_config
+    api_key = cfg.api_key
     if not api_key:
         raise ValueError(
             "OPENROUTER_API_KEY (or OPENAI_API_KEY) must be set. Add it to .env or export it."
         )
-    # Per-effort model, falling back to the global default
-    if model is None:
-        default_model = os.environ.get("OPENROUTER_MODEL", "deepseek/deepseek-v3.2")
-        model = EFFORT_MODELS.get(effort, "").strip() or default_model
     # Build reasoning config from effort level
     reasoning_effort = EFFORT_REASONING.get(effort, "").strip().lower()
     reasoning = None
@@ -212,14 +327,32 @@ def _create_llm(effort: str = "normal", model: str | None = None):
         model=model,
         temperature=0,
         api_key=api_key,
-        timeout=LLM_TIMEOUT * 1000,  # SDK expects milliseconds
-        app_url=os.environ.get("YOUR_SITE_URL", "https://github.com/JustinGuese/openshrimp"),
-        app_title="openShrimp",
+        timeout=cfg.timeout_ms,
+        app_url=cfg.app_url,
+        app_title=cfg.app_title,
     )
     if reasoning:
         kwargs["reasoning"] = reasoning
-    llm = ChatOpenRouter(**kwargs)
-    return llm, model
+    return ChatOpenRouter(**kwargs)
+
+
+# (effort, model) -> llm.bind_tools(TOOLS); binding serializes every tool schema.
+_bound_llms: dict[tuple[str, str], object] = {}
+_bound_llms_lock = threading.Lock()
+
+
+def _llm_with_tools(effort: str = "normal", model: str | None = None):
+    """Return (llm bound to TOOLS, model), cached like _create_llm."""
+    llm, model = _create_llm(effort=effort, model=model)
+    key = (effort, model)
+    bound = _bound_llms.get(key)
+    if bound is None:
+        with _bound_llms_lock:
+            bound = _bound_llms.get(key)
+            if bound is None:
+                bound = llm.bind_tools(TOOLS) if TOOLS else llm
+                _bound_llms[key] = bound
+    return bound, model
 
 
 _EFFORT_GUIDANCE: dict[str, str] = {
@@ -238,13 +371,29 @@ _EFFORT_GUIDANCE: dict[str, str] = {
 }
 
 
-def _system_prompt(max_tool_rounds: int, effort: str = "normal") -> str:
-    """Build system prompt with effort-aware guidance and tool-round limit."""
-    prompt = SYSTEM_PROMPT_BASE
-    guidance = _EFFORT_GUIDANCE.get(effort, _EFFORT_GUIDANCE["normal"])
-    prompt += f"\n\n{guidance}"
-    prompt += f"\nUse at most {max_tool_rounds} tool calls total; then summarize your answer without further tool use."
-    return prompt
+# Mark the static system prompt as a prompt-cache breakpoint (OpenRouter passes
+# cache_control to Anthropic/Gemini; providers with automatic caching don't need it).
+OPENROUTER_CACHE_CONTROL = os.environ.get("OPENROUTER_CACHE_CONTROL", "").strip().lower() in ("1", "true", "yes")
+
+
+def _static_system_message(text: str) -> SystemMessage:
+    if OPENROUTER_CACHE_CONTROL:
+        return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+    return SystemMessage(content=text)
+
+
+# Base prompt + effort guidance, one SystemMessage per effort level. These stay
+# byte-identical across runs and rounds so providers can reuse their prompt cache;
+# the per-round budget goes after the conversation (see _budget_status_message).
+_SYSTEM_MESSAGE_BY_EFFORT: dict[str, SystemMessage] = {
+    effort: _static_system_message(f"{SYSTEM_PROMPT_BASE}\n\n{guidance}")
+    for effort, guidance in _EFFORT_GUIDANCE.items()
+}
+
+
+def _system_message(effort: str = "normal") -> SystemMessage:
+    """Static system prompt (base prompt + effort guidance) for this effort level."""
+    return _SYSTEM_MESSAGE_BY_EFFORT.get(effort) or _SYSTEM_MESSAGE_BY_EFFORT["normal"]
 
 
 def _count_tool_rounds(messages: list) -> int:
@@ -252,7 +401,31 @@ def _count_tool_rounds(messages: list) -> int:
     return sum(1 for msg in messages if getattr(msg, "tool_calls", None))
 
 
-def _llm_call(state: MessagesState) -> dict:
+@functools.lru_cache(maxsize=16)
+def _budget_limit_message(max_rounds: int) -> SystemMessage:
+    """Tool-round limit; fixed for the whole run, so it can sit in the cached prefix."""
+    return SystemMessage(
+        content=f"Use at most {max_rounds} tool calls total; "
+        "then summarize your answer without further tool use."
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def _budget_status_message(max_rounds: int, remaining: int, used_any: bool) -> HumanMessage:
+    """Remaining budget, sent after the conversation so the prefix before it stays cacheable.
+
+    A user-role note rather than a SystemMessage: some providers hoist system messages into
+    the system prompt, which would put the changing count back in front of the history.
+    """
+    content = f"[Tool budget: {remaining}/{max_rounds} calls remaining."
+    if remaining <= 2 and used_any:
+        content += " You are running low. Wrap up and provide your final answer now."
+    elif remaining == 0:
+        content += " You have NO calls left. Provide your final answer immediately."
+    return HumanMessage(content=content + "]")
+
+
+async def _llm_call(state: MessagesState) -> dict:
     """LLM node: invoke model with tools and return the response message."""
     try:
         run_config = get_config()
@@ -262,28 +435,30 @@ def _llm_call(state: MessagesState) -> dict:
     except RuntimeError:
         max_rounds = DEFAULT_MAX_TOOL_ROUNDS
         effort = "normal"
-    system_content = _system_prompt(max_rounds, effort)
     used_rounds = _count_tool_rounds(state["messages"])
     remaining = max(0, max_rounds - used_rounds)
-    budget_line = f"\n\nTool budget: {remaining}/{max_rounds} calls remaining."
-    if remaining <= 2 and used_rounds > 0:
-        budget_line += " You are running low. Wrap up and provide your final answer now."
-    elif remaining == 0:
-        budget_line += " You have NO calls left. Provide your final answer immediately."
-    system_content += budget_line
-    messages = [SystemMessage(content=system_content)] + list(state["messages"])
-    total_chars = sum(len(str(getattr(m, "content", ""))) for m in messages)
-    logger.info(
-        "Calling LLM (OpenRouter) — messages=%d, context_chars=%d, timeout=%ds",
-        len(messages),
-        total_chars,
-        LLM_TIMEOUT,
-    )
-    llm, primary_model = _create_llm(effort=effort)
-    llm_with_tools = llm.bind_tools(TOOLS) if TOOLS else llm
+    messages = [
+        _system_message(effort),
+        _budget_limit_message(max_rounds),
+        *state["messages"],
+        _budget_status_message(max_rounds, remaining, used_rounds > 0),
+    ]
+    if logger.isEnabledFor(logging.INFO):
+        # Sums every message's content, so only pay for it when the line is emitted.
+        total_chars = sum(len(str(getattr(m, "content", ""))) for m in messages)
+        logger.info(
+            "Calling LLM (OpenRouter) — messages=%d, context_chars=%d, timeout=%ds",
+            len(messages),
+            total_chars,
+            LLM_TIMEOUT,
+        )
+    llm_with_tools, primary_model = _llm_with_tools(effort=effort)
     t0 = time.monotonic()
+    # The sync SDK client runs in a worker thread: its httpx connection pool is shared by
+    # every run, whereas an async client is tied to the event loop of the run that used
+    # it first (each run_agent call has its own loop).
     try:
-        response = llm_with_tools.invoke(messages)
+        response = await asyncio.to_thread(llm_with_tools.invoke, messages)
     except Exception as llm_exc:
         fallback_model = EFFORT_MODELS_FALLBACK.get(effort)
         if fallback_model and fallback_model != primary_model and _is_transient_llm_error(llm_exc):
@@ -291,9 +466,8 @@ def _llm_call(state: MessagesState) -> dict:
                 "Primary model %s failed: %s. Falling back to %s.",
                 primary_model, llm_exc, fallback_model,
             )
-            fallback_llm, _ = _create_llm(effort=effort, model=fallback_model)
-            llm_with_tools_fb = fallback_llm.bind_tools(TOOLS) if TOOLS else fallback_llm
-            response = llm_with_tools_fb.invoke(messages)
+            llm_with_tools_fb, _ = _llm_with_tools(effort=effort, model=fallback_model)
+            response = await asyncio.to_thread(llm_with_tools_fb.invoke, messages)
         else:
             raise
     elapsed = time.monotonic() - t0
@@ -305,11 +479,120 @@ def _llm_call(state: MessagesState) -> dict:
     return {"messages": [response]}
 
 
-def _tool_node(state: MessagesState) -> dict:
-    """Execute tool calls from the last message and return ToolMessages."""
+@dataclass
+class ToolRunContext:
+    """Per-run tool state, passed to the graph as config["configurable"]["tool_ctx"]."""
+
+    call_counts: dict[bytes, int] = field(default_factory=dict)  # _tool_call_hash -> calls
+    name_counts: dict[str, int] = field(default_factory=dict)  # tool name -> calls
+    on_progress: Callable[[str, dict, str], None] | None = None
+    pending_memory: list[tuple[str, str]] = field(default_factory=list)  # (content, source)
+
+
+def _tool_run_context() -> ToolRunContext:
+    """This run's ToolRunContext; a fresh one if the graph was invoked without it."""
+    try:
+        ctx = (get_config().get("configurable") or {}).get("tool_ctx")
+    except RuntimeError:
+        ctx = None
+    return ctx if ctx is not None else ToolRunContext()
+
+
+# Heartbeat DB writes run here so they never hold up the next LLM round.
+_HEARTBEAT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heartbeat")
+
+
+def _heartbeat(task_id: int) -> None:
+    try:
+        task_service.update_heartbeat(task_id)
+    except Exception as e:
+        logger.debug("Heartbeat update failed for task %s: %s", task_id, e)
+
+
+# Auto-saved research results are embedded in batches of this size (and at the end of a run).
+MEMORY_SAVE_BATCH = max(1, int(os.environ.get("AGENT_MEMORY_SAVE_BATCH", "5")))
+_MEMORY_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-save")
+
+
+def _save_memory(items: list[tuple[str, str]]) -> None:
+    """Store auto-saved research results; one embeddings call when memory_rag supports it."""
+    add_many = (_MEMORY_ADD_TOOL.metadata or {}).get("add_many")
+    try:
+        if add_many is not None:
+            stored = add_many(items)
+        else:
+            for content, source in items:
+                _MEMORY_ADD_TOOL.invoke({"content": content, "source": source})
+            stored = len(items)
+        logger.info("Auto-saved %d research tool result(s) to memory", stored)
+    except Exception as mem_err:
+        logger.warning("Auto-save to memory failed (%d item(s)): %s", len(items), mem_err)
+
+
+def _flush_memory(ctx: ToolRunContext) -> Future | None:
+    """Hand pending auto-saves to the background writer (keeps telegram_state for user_id).
+
+    Returns the write's future, or None if there was nothing to save.
+    """
+    items, ctx.pending_memory = ctx.pending_memory, []
+    if items and _MEMORY_ADD_TOOL:
+        return _MEMORY_EXECUTOR.submit(contextvars.copy_context().run, _save_memory, items)
+    return None
+
+
+# Tool name -> calls abandoned at their timeout (process lifetime), for tuning TOOL_TIMEOUT
+_tool_timeouts: collections.Counter = collections.Counter()
+
+
+async def _invoke_tool(tool, name: str, args: dict, timeout: float | None = None):
+    """Run one tool call off the event loop; errors and timeouts become the observation."""
+    logger.info("Invoking tool: %s with args: %s", name, args)
+    try:
+        t0 = time.monotonic()
+        # Sync tools run in the default executor with a copy of the current context,
+        # so telegram_state (task id, chat) stays visible inside the tool. On timeout the
+        # worker thread cannot be stopped; it finishes in the background, result unused.
+        observation = await asyncio.wait_for(tool.ainvoke(args), timeout)
+        elapsed = time.monotonic() - t0
+        logger.info(
+            "Tool %s finished in %.1fs (result length=%s)",
+            name,
+            elapsed,
+            len(observation) if isinstance(observation, (str, bytes)) else len(str(observation)),
+        )
+        return observation
+    except TimeoutError:
+        _tool_timeouts[name] += 1
+        logger.warning(
+            "Tool %s timed out after %ss (%d timeout(s) for this tool so far)",
+            name, timeout, _tool_timeouts[name],
+        )
+        return f"Tool error: {name} timed out after {timeout:g}s"
+    except Exception as e:
+        logger.exception("Tool %s error: %s", name, e)
+        return f"Tool error: {e!r}"
+
+
+def _report_progress(callback: Callable[[str, dict, str], None], name: str, args: dict, observation: str) -> None:
+    try:
+        callback(name, args, observation)
+    except Exception:
+        pass
+
+
+async def _tool_node(state: MessagesState) -> dict:
+    """Execute tool calls from the last message and return ToolMessages.
+
+    Calls run in the order the model gave them (write_file, then read_file). Only runs
+    of consecutive read-only calls (metadata["read_only"]) overlap: different tools in
+    such a run go concurrently, calls to the same tool still one after another.
+    Loop detection runs in call order before anything starts; each call's ToolMessage
+    and progress callback are produced as soon as that call finishes. The returned
+    ToolMessages keep the order of the tool calls.
+    """
     last_message = state["messages"][-1]
     tool_calls = getattr(last_message, "tool_calls", None) or []
-    result = []
+    calls = []
     for tool_call in tool_calls:
         name = getattr(tool_call, "name", None) or (tool_call.get("name", "") if isinstance(tool_call, dict) else "")
         args = getattr(tool_call, "args", None)
@@ -317,129 +600,193 @@ def _tool_node(state: MessagesState) -> dict:
             args = tool_call.get("args", {}) or {}
         args = args or {}
         call_id = getattr(tool_call, "id", None) or (tool_call.get("id", "") if isinstance(tool_call, dict) else "")
-        tool = TOOLS_BY_NAME.get(name)
-        blocked = False
-        if tool is None:
-            observation = f"Unknown tool: {name}"
+        calls.append((name, args, call_id))
+
+    ctx = _tool_run_context()
+    tool_counts, tool_name_counts = ctx.call_counts, ctx.name_counts
+
+    # --- Loop / frequency detection, in call order, before anything runs ---
+    observations: list = [None] * len(calls)
+    blocked = [False] * len(calls)
+    ran = [False] * len(calls)
+    counts: list[tuple[int, int]] = [(0, 0)] * len(calls)  # (count, name_count)
+    hashes: list[bytes | None] = [None] * len(calls)
+    excerpted = [False] * len(calls)  # ToolMessage points the model at memory_retrieve
+    entries: list[_ToolEntry | None] = [None] * len(calls)
+    for i, (name, args, _call_id) in enumerate(calls):
+        entry = entries[i] = _TOOL_DISPATCH.get(name)
+        if entry is None:
+            observations[i] = f"Unknown tool: {name}"
             logger.warning("Unknown tool: %s", name)
+            continue
+        # --- Tool loop detection (identical args) ---
+        h = hashes[i] = _tool_call_hash(name, args)
+        count = tool_counts[h] = tool_counts.get(h, 0) + 1
+
+        # --- Per-tool-name frequency detection (varied args) ---
+        name_count = tool_name_counts[name] = tool_name_counts.get(name, 0) + 1
+        counts[i] = (count, name_count)
+
+        if count >= TOOL_LOOP_BLOCK_THRESHOLD:
+            logger.warning(
+                "Tool loop BLOCKED: %s called %d times with identical args", name, count,
+            )
+            observations[i] = (
+                f"BLOCKED: You have called {name} with identical arguments {count} times. "
+                "This looks like an infinite loop. Try a different approach or tool."
+            )
+            blocked[i] = True
+        elif name_count >= entry.block_limit:
+            logger.warning(
+                "Tool frequency BLOCKED: %s called %d times total", name, name_count,
+            )
+            observations[i] = (
+                f"BLOCKED: You have called {name} {name_count} times this session. "
+                "You are stuck in a loop. Stop using this tool and either: "
+                "(1) use a DIFFERENT tool, (2) provide your final answer, or "
+                "(3) mark the task as failed explaining what you could not do."
+            )
+            blocked[i] = True
+        else:
+            ran[i] = True
+
+    result: list = [None] * len(calls)
+    progress: list[asyncio.Future] = []
+
+    def _finish(i: int) -> None:
+        """Build call i's ToolMessage and start its progress callback as soon as it is done."""
+        name, args, call_id = calls[i]
+        observation = observations[i]
+        # One str conversion, shared by warnings, memory save, truncation and the callback.
+        if isinstance(observation, bytes):
+            obs_str = observation.decode("utf-8", errors="replace")
+        elif isinstance(observation, str):
+            obs_str = observation
         else:
-            # --- Tool loop detection (identical args) ---
-            tool_counts = getattr(_thread_local, "tool_call_counts", None)
-            if tool_counts is None:
-                tool_counts = {}
-                _thread_local.tool_call_counts = tool_counts
-            h = _tool_call_hash(name, args)
-            tool_counts[h] = tool_counts.get(h, 0) + 1
-            count = tool_counts[h]
-
-            # --- Per-tool-name frequency detection (varied args) ---
-            tool_name_counts = getattr(_thread_local, "tool_name_counts", None)
-            if tool_name_counts is None:
-                tool_name_counts = {}
-                _thread_local.tool_name_counts = tool_name_counts
-            tool_name_counts[name] = tool_name_counts.get(name, 0) + 1
-            name_count = tool_name_counts[name]
-
-            if count >= TOOL_LOOP_BLOCK_THRESHOLD:
+            obs_str = str(observation)
+        count, name_count = counts[i]
+        entry = entries[i]
+        # Appended after truncation so it always reaches the model, and never saved to memory.
+        warning = ""
+        if ran[i]:
+            if count >= TOOL_LOOP_WARN_THRESHOLD:
                 logger.warning(
-                    "Tool loop BLOCKED: %s called %d times with identical args", name, count,
+                    "Tool loop WARNING: %s called %d times with identical args", name, count,
                 )
-                observation = (
-                    f"BLOCKED: You have called {name} with identical arguments {count} times. "
-                    "This looks like an infinite loop. Try a different approach or tool."
+                warning = (
+                    f"\n\n⚠️ WARNING: You have called {name} with identical arguments "
+                    f"{count} times. Vary your approach or move on."
                 )
-                blocked = True
-            elif name_count >= TOOL_NAME_BLOCK_OVERRIDES.get(name, TOOL_NAME_BLOCK_THRESHOLD):
+            elif name_count >= entry.warn_limit:
                 logger.warning(
-                    "Tool frequency BLOCKED: %s called %d times total", name, name_count,
+                    "Tool frequency WARNING: %s called %d times total", name, name_count,
                 )
-                observation = (
-                    f"BLOCKED: You have called {name} {name_count} times this session. "
-                    "You are stuck in a loop. Stop using this tool and either: "
-                    "(1) use a DIFFERENT tool, (2) provide your final answer, or "
-                    "(3) mark the task as failed explaining what you could not do."
+                warning = (
+                    f"\n\n⚠️ WARNING: You have called {name} {name_count} times this session. "
+                    "Consider whether you are making progress. If not, try a different "
+                    "approach or wrap up with what you have."
                 )
-                blocked = True
-            else:
-                logger.info("Invoking tool: %s with args: %s", name, args)
-                try:
-                    t0 = time.monotonic()
-                    observation = tool.invoke(args)
-                    elapsed = time.monotonic() - t0
-                    logger.info(
-                        "Tool %s finished in %.1fs (result length=%s)",
-                        name,
-                        elapsed,
-                        len(str(observation)),
-                    )
-                except Exception as e:
-                    logger.exception("Tool %s error: %s", name, e)
-                    observation = f"Tool error: {e!r}"
-
-                if count >= TOOL_LOOP_WARN_THRESHOLD:
-                    logger.warning(
-                        "Tool loop WARNING: %s called %d times with identical args", name, count,
-                    )
-                    observation = str(observation) + (
-                        f"\n\n⚠️ WARNING: You have called {name} with identical arguments "
-                        f"{count} times. Vary your approach or move on."
-                    )
-                elif name_count >= TOOL_NAME_WARN_OVERRIDES.get(name, TOOL_NAME_WARN_THRESHOLD):
-                    logger.warning(
-                        "Tool frequency WARNING: %s called %d times total", name, name_count,
-                    )
-                    observation = str(observation) + (
-                        f"\n\n⚠️ WARNING: You have called {name} {name_count} times this session. "
-                        "Consider whether you are making progress. If not, try a different "
-                        "approach or wrap up with what you have."
-                    )
         # Auto-save to memory after research tools (plugin has "research" tag)
         # Skip if the call was blocked (nothing useful to save)
-        if not blocked and "research" in TOOL_PLUGIN_TAGS.get(name, []):
-            obs_str = str(observation).strip()
-            skip_error_prefixes = ("Tool error", "[memory_rag ERROR]", "[browser ERROR]")
-            if not any(obs_str.startswith(p) for p in skip_error_prefixes):
-                memory_add_tool = TOOLS_BY_NAME.get("memory_add")
-                if memory_add_tool:
-                    content = obs_str[:12_000]
-                    source = args.get("url", "") if isinstance(args, dict) else ""
-                    try:
-                        memory_add_tool.invoke({"content": content, "source": source})
-                        logger.info("Auto-saved research tool result to memory (tool=%s)", name)
-                    except Exception as mem_err:
-                        logger.warning("Auto-save to memory failed (tool=%s): %s", name, mem_err)
+        content = None
+        if _MEMORY_ADD_TOOL and not blocked[i] and entry is not None and entry.research:
+            obs_stripped = obs_str.strip()
+            if not obs_stripped.startswith(_SKIP_ERROR_PREFIXES):
+                source = args.get("url", "") if isinstance(args, dict) else ""
+                saved = obs_stripped[:12_000]
+                ctx.pending_memory.append((saved, source))
+                if source and len(obs_str) > AGENT_TOOL_OBS_MAX:
+                    excerpted[i] = True
+                    stored = (
+                        "the full result is" if len(saved) == len(obs_stripped)
+                        else f"the first {len(saved):,} chars are"
+                    )
+                    content = (
+                        obs_str[:AGENT_TOOL_OBS_MAX]
+                        + f"\n\n[... {len(obs_str) - AGENT_TOOL_OBS_MAX:,} more chars; {stored} saved"
+                        f" to memory, use memory_retrieve to recall details from {source}]"
+                    )
         # Truncate observation to avoid blowing up context
-        obs_str = _truncate_observation(str(observation))
-        result.append(ToolMessage(content=obs_str, tool_call_id=call_id))
-        _cb = getattr(_thread_local, "on_progress", None)
-        if _cb:
-            try:
-                _cb(name, args, str(observation))
-            except Exception:
-                pass
+        if content is None:
+            content = _truncate_observation(obs_str)
+        result[i] = ToolMessage(content=content + warning, tool_call_id=call_id)
+        if ctx.on_progress:
+            # The callback may block (e.g. a Telegram send), so keep it off the event loop
+            # and out of the way of the next call to the same tool.
+            progress.append(asyncio.ensure_future(
+                asyncio.to_thread(_report_progress, ctx.on_progress, name, args, obs_str + warning)
+            ))
+
+    # Created per round: each run_agent call has its own event loop.
+    limit = asyncio.Semaphore(AGENT_TOOL_CONCURRENCY)
+
+    async def _run_in_order(name: str, indices: list[int]) -> None:
+        entry = _TOOL_DISPATCH[name]
+        first_by_hash: dict[bytes, int] | None = {} if entry.read_only else None
+        for i in indices:
+            if first_by_hash is not None and hashes[i] in first_by_hash:
+                logger.info("Reusing result of identical %s call in this round", name)
+                observations[i] = observations[first_by_hash[hashes[i]]]
+            else:
+                async with limit:
+                    observations[i] = await _invoke_tool(entry.tool, name, calls[i][1], entry.timeout)
+                if first_by_hash is not None:
+                    first_by_hash[hashes[i]] = i
+            _finish(i)
+
+    for i in range(len(calls)):
+        if not ran[i]:
+            _finish(i)  # unknown or blocked: nothing to wait for
+    # A call with side effects waits for every call before it and holds back every call
+    # after it; read-only calls between two of those are gathered by tool name.
+    reads: dict[str, list[int]] = {}
+    for i in range(len(calls)):
+        if not ran[i]:
+            continue
+        if entries[i].read_only:
+            reads.setdefault(calls[i][0], []).append(i)
+            continue
+        if reads:
+            await asyncio.gather(*(_run_in_order(name, indices) for name, indices in reads.items()))
+            reads = {}
+        await _run_in_order(calls[i][0], [i])
+    if reads:
+        await asyncio.gather(*(_run_in_order(name, indices) for name, indices in reads.items()))
+    await asyncio.gather(*progress)
+
+    # An excerpt tells the model the rest is in memory, so wait until it is stored: the
+    # next round may call memory_retrieve for it. Otherwise save in the background once a
+    # batch is full.
+    if any(excerpted):
+        saved = _flush_memory(ctx)
+        if saved is not None:
+            await asyncio.wrap_future(saved)
+    elif len(ctx.pending_memory) >= MEMORY_SAVE_BATCH:
+        _flush_memory(ctx)
 
     # Heartbeat: update the task's heartbeat_at after each round of tool calls
-    try:
-        import telegram_state
-        import task_service as _task_service
-        task_id = telegram_state.get_task_id()
-        if task_id:
-            _task_service.update_heartbeat(task_id)
-    except Exception:
-        pass
+    task_id = telegram_state.get_task_id()
+    if task_id:
+        _HEARTBEAT_EXECUTOR.submit(_heartbeat, task_id)
 
     return {"messages": result}
 
 
+def flush_notifications() -> None:
+    """Deliver telegram_send messages still queued, e.g. before sending the final answer."""
+    tool = TOOLS_BY_NAME.get("telegram_send")
+    flush = (tool.metadata or {}).get("flush") if tool is not None else None
+    if flush is not None and not flush():
+        logger.warning("Queued telegram_send messages were not delivered in time")
+
+
 def _should_continue(state: MessagesState):
     """Route to tool_node if the last message has tool_calls, else END."""
-    messages = state["messages"]
-    if not messages:
+    try:
+        last = state["messages"][-1]
+    except IndexError:
         return END
-    last = messages[-1]
-    if getattr(last, "tool_calls", None):
-        return "tool_node"
-    return END
+    return "tool_node" if getattr(last, "tool_calls", None) else END
 
 
 def create_research_agent():
@@ -453,21 +800,38 @@ def create_research_agent():
     return builder.compile(checkpointer=None, interrupt_before=None, interrupt_after=None, debug=False)
 
 
+@functools.lru_cache(maxsize=1)
+def _compiled_agent():
+    """The graph is static (limits and effort come in via configurable), so compile it once."""
+    return create_research_agent()
+
+
 def _recursion_limit(max_tool_rounds: int) -> int:
     # LangGraph: START→llm, then N times (tool→llm→tool), then one more llm for final answer
     return 2 + max_tool_rounds * 2
 
 
-def _fallback_summary(query: str, messages: list) -> str:
-    """Produce a best-effort summary after hitting the recursion limit."""
+def _iter_fallback_summary(query: str, messages: list) -> Iterator[str]:
+    """Stream a best-effort summary after hitting the recursion limit, chunk by chunk.
+
+    The first chunk is the limit notice, so on_token can show something before the
+    model's first token arrives.
+    """
     tool_contents = [
         msg.content[:3000]
         for msg in messages
         if isinstance(msg, ToolMessage) and msg.content
     ]
     if not tool_contents:
-        return "Research hit the tool-call limit before gathering enough data to answer."
+        yield "Research hit the tool-call limit before gathering enough data to answer."
+        return
     gathered = "\n\n---\n\n".join(tool_contents)
+    if len(gathered) < FALLBACK_SUMMARY_MIN_CHARS:
+        # Little enough to show as-is; skip the extra LLM round on an already slow path.
+        logger.info("Fallback: returning %d gathered chars without summarizing.", len(gathered))
+        yield "⚠️ Hit tool-call limit. Gathered so far:\n\n"
+        yield gathered
+        return
     summary_prompt = (
         f"You were researching the following query but hit the tool-call limit.\n"
         f"Query: {query}\n\n"
@@ -477,42 +841,86 @@ def _fallback_summary(query: str, messages: list) -> str:
     )
     logger.info("Calling LLM for fallback summary (%d tool results).", len(tool_contents))
     llm, _ = _create_llm(effort="normal")
-    response = llm.invoke([HumanMessage(content=summary_prompt)])
-    result = getattr(response, "content", str(response)) or ""
-    logger.info("Fallback summary length=%d", len(result))
-    return f"⚠️ Hit tool-call limit; here's a summary of what was found:\n\n{result}"
+    yield "⚠️ Hit tool-call limit; here's a summary of what was found:\n\n"
+    length = 0
+    for chunk in llm.stream([HumanMessage(content=summary_prompt)]):
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        if text:
+            length += len(text)
+            yield text
+    logger.info("Fallback summary length=%d", length)
+
+
+async def _fallback_summary(
+    query: str, messages: list, on_token: Callable[[str], None] | None = None
+) -> str:
+    """Produce a best-effort summary after hitting the recursion limit.
+
+    The blocking stream is advanced in a worker thread; each chunk goes to on_token on
+    the event loop as it arrives, like the graph's own output.
+    """
+    chunks = _iter_fallback_summary(query, messages)
+    parts: list[str] = []
+    while (text := await asyncio.to_thread(next, chunks, None)) is not None:
+        parts.append(text)
+        if on_token:
+            try:
+                on_token(text)
+            except Exception:
+                pass
+    return "".join(parts)
 
 
-def run_agent(query: str, on_progress=None, effort: str = "normal") -> str:
+async def arun_agent(
+    query: str,
+    on_progress=None,
+    effort: str = "normal",
+    on_token: Callable[[str], None] | None = None,
+) -> str:
     """Run the task agent on a query and return the final assistant message content.
 
     Args:
         query: The task or research query.
         on_progress: Optional callback(tool_name, args, observation) called after each tool.
         effort: One of "quick", "normal", "deep". Auto-upgrades to "deep" if deep keywords found.
+        on_token: Optional callback(text) for each chunk of model output as it streams in
+            (every LLM round, including the final answer or the recursion-limit summary).
+            Runs on the event loop, so it should return quickly.
     """
-    _thread_local.on_progress = on_progress
-    _thread_local.tool_call_counts = {}
-    _thread_local.tool_name_counts = {}
     # Auto-upgrade: if user asked for deep research but effort wasn't explicitly set to deep
     if effort == "normal" and _is_deep_research(query):
         effort = "deep"
     max_rounds = EFFORT_ROUNDS.get(effort, DEFAULT_MAX_TOOL_ROUNDS)
     logger.info("Invoking task agent... (max_tool_rounds=%s, effort=%s)", max_rounds, effort)
-    agent = create_research_agent()
+    agent = _compiled_agent()
+    tool_ctx = ToolRunContext(on_progress=on_progress)
     config = {
         "recursion_limit": _recursion_limit(max_rounds),
-        "configurable": {"max_tool_rounds": max_rounds, "effort": effort},
+        "configurable": {
+            "max_tool_rounds": max_rounds,
+            "effort": effort,
+            "tool_ctx": tool_ctx,
+        },
     }
 
-    # Stream so we can capture accumulated state on recursion-limit error.
-    all_messages: list = [HumanMessage(content=query)]
+    # Stream so we can capture accumulated state on recursion-limit error
+    initial_message = HumanMessage(content=query)
+    all_messages: list = [initial_message]
     try:
-        for chunk in agent.stream(
-            {"messages": [HumanMessage(content=query)]},
+        async for mode, chunk in agent.astream(
+            {"messages": [initial_message]},
             config=config,
-            stream_mode="values",
+            stream_mode=["values", "messages"] if on_token else ["values"],
         ):
+            if mode == "messages":
+                msg, metadata = chunk
+                text = msg.content if isinstance(msg.content, str) else ""
+                if text and metadata.get("langgraph_node") == "llm_call":
+                    try:
+                        on_token(text)
+                    except Exception:
+                        pass
+                continue
             msgs = chunk.get("messages") or []
             if msgs:
                 all_messages = list(msgs)
@@ -521,8 +929,10 @@ def run_agent(query: str, on_progress=None, effort: str = "normal") -> str:
             logger.warning(
                 "Recursion limit hit after %d messages; falling back to summary.", len(all_messages)
             )
-            return _fallback_summary(query, all_messages)
+            return await _fallback_summary(query, all_messages, on_token)
         raise
+    finally:
+        _flush_memory(tool_ctx)
 
     if not all_messages:
         logger.warning("Agent returned no messages")
@@ -531,3 +941,24 @@ def run_agent(query: str, on_progress=None, effort: str = "normal") -> str:
     out = getattr(last, "content", str(last)) or ""
     logger.info("Agent done (final message length=%s)", len(out))
     return out
+
+
+def run_agent(
+    query: str,
+    on_progress=None,
+    effort: str = "normal",
+    on_token: Callable[[str], None] | None = None,
+) -> str:
+    """Synchronous arun_agent for worker threads; runs the graph on a private event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(
+            arun_agent(query, on_progress=on_progress, effort=effort, on_token=on_token)
+        )
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            # Unlike asyncio.run, don't wait for the loop's executor: a tool call abandoned
+            # at its timeout may still be running there.
+            loop.close()
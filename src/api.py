@@ -16,10 +16,12 @@ if str(_src) not in sys.path:
 
 _VIS_ROOT = Path(__file__).resolve().parent / "visualization"
 
+import anyio.to_thread
 from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import TypeAdapter
 from sqlalchemy import case
 from sqlmodel import Session, select
 
@@ -29,6 +31,8 @@ from visualization.api_schemas import TaskCreate, TaskRead, TaskUpdate
 from models import Priority, Project, Task, TaskStatus, User
 
 DASHBOARD_ADMIN_TOKEN = (os.environ.get("DASHBOARD_ADMIN_TOKEN") or "").strip()
+# Sync routes (all DB access) run in AnyIO's worker threads; its default is 40.
+API_THREADPOOL_SIZE = int(os.environ.get("API_THREADPOOL_SIZE", "0"))
 
 # SQL expression: high=3, medium=2, low=1 for ORDER BY ... DESC
 _priority_order_sql = case(
@@ -37,6 +41,8 @@ _priority_order_sql = case(
     (Task.priority == Priority.LOW, 1),
     else_=2,
 )
+# Base task listing (priority desc, then id); routes add their filters to it.
+_TASKS_BY_PRIORITY = select(Task).order_by(_priority_order_sql.desc(), Task.id)
 
 app = FastAPI(title="openshrimp Tasks API")
 
@@ -46,6 +52,8 @@ templates = Jinja2Templates(directory=str(_VIS_ROOT / "templates"))
 @app.on_event("startup")
 def on_startup() -> None:
     db.init_db()
+    if API_THREADPOOL_SIZE > 0:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
 
 
 @app.exception_handler(Exception)
@@ -63,7 +71,7 @@ def log_unhandled_exception(request: Request, exc: Exception):
 
 
 @app.get("/healthz")
-def healthz() -> dict[str, str]:
+async def healthz() -> dict[str, str]:
     """No-auth health check for load balancers and k8s/docker probes."""
     return {"status": "ok"}
 
@@ -93,23 +101,21 @@ def get_dashboard_auth(request: Request) -> tuple[int | None, str]:
     return (user_id, token)
 
 
-def _task_to_read(task: Task) -> TaskRead:
-    return TaskRead(
-        id=task.id,
-        title=task.title,
-        user_id=task.user_id,
-        project_id=task.project_id,
-        description=task.description,
-        status=task.status,
-        priority=task.priority,
-        assignee_id=task.assignee_id,
-        pending_question=task.pending_question,
-        effort=task.effort,
-        created_at=task.created_at,
-        updated_at=task.updated_at,
-        scheduled_at=task.scheduled_at,
-        repeat_interval_seconds=task.repeat_interval_seconds,
-    )
+# Validates/serializes a whole task list in one call (fields are read from the ORM rows).
+_TASKS_ADAPTER = TypeAdapter(list[TaskRead])
+
+# Same escapes as Jinja's tojson, so JSON can be embedded in a <script> block.
+_HTML_SAFE_JSON = str.maketrans({"<": "\\u003c", ">": "\\u003e", "&": "\\u0026", "'": "\\u0027"})
+
+
+def _tasks_query(scoped_user_id: int | None, project_id: int | None):
+    """Tasks visible to scoped_user_id (all if None), optionally in one project; priority order."""
+    q = _TASKS_BY_PRIORITY
+    if scoped_user_id is not None:
+        q = q.where(Task.user_id == scoped_user_id)
+    if project_id is not None:
+        q = q.where(Task.project_id == project_id)
+    return q
 
 
 @app.get("/tasks", response_model=list[TaskRead])
@@ -120,14 +126,8 @@ def list_tasks(
 ) -> list[TaskRead]:
     """List tasks for the token's user (or all if admin), optionally filtered by project. Sorted by priority desc (high first), then id."""
     scoped_user_id, _ = auth
-    q = select(Task)
-    if scoped_user_id is not None:
-        q = q.where(Task.user_id == scoped_user_id)
-    if project_id is not None:
-        q = q.where(Task.project_id == project_id)
-    q = q.order_by(_priority_order_sql.desc(), Task.id)
-    tasks = list(session.exec(q))
-    return [_task_to_read(t) for t in tasks]
+    tasks = session.exec(_tasks_query(scoped_user_id, project_id)).all()
+    return _TASKS_ADAPTER.validate_python(tasks, from_attributes=True)
 
 
 @app.get("/tasks/{task_id}", response_model=TaskRead)
@@ -143,7 +143,7 @@ def get_task(
     scoped_user_id, _ = auth
     if scoped_user_id is not None and task.user_id != scoped_user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
-    return _task_to_read(task)
+    return TaskRead.model_validate(task, from_attributes=True)
 
 
 @app.post("/tasks", response_model=TaskRead, status_code=201)
@@ -169,7 +169,7 @@ def create_task(
     session.add(task)
     session.commit()
     session.refresh(task)
-    return _task_to_read(task)
+    return TaskRead.model_validate(task, from_attributes=True)
 
 
 @app.patch("/tasks/{task_id}", response_model=TaskRead)
@@ -203,7 +203,7 @@ def update_task(
     session.add(task)
     session.commit()
     session.refresh(task)
-    return _task_to_read(task)
+    return TaskRead.model_validate(task, from_attributes=True)
 
 
 @app.delete("/tasks/{task_id}", status_code=204)
@@ -229,6 +229,27 @@ DEFAULT_USER_ID = 1
 OPENSHRIMP_USER_NAME = "openshrimp"
 
 
+def _assignee_options(session: Session, current_user_id: int) -> list[dict]:
+    """Current user and openshrimp user as dropdown options, loaded in one query."""
+    q = (
+        select(User)
+        .where((User.id == current_user_id) | (User.name == OPENSHRIMP_USER_NAME))
+        .order_by(User.id)
+    )
+    current = openshrimp = None
+    for user in session.exec(q):
+        if user.id == current_user_id:
+            current = user
+        if openshrimp is None and user.name == OPENSHRIMP_USER_NAME:
+            openshrimp = user
+    options = []
+    if current:
+        options.append({"id": current.id, "name": "Current user"})
+    if openshrimp and openshrimp.id != current_user_id:
+        options.append({"id": openshrimp.id, "name": "openshrimp user"})
+    return options
+
+
 @app.get("/projects")
 def list_projects(
     session: Session = Depends(get_session),
@@ -251,15 +272,7 @@ def list_assignee_options(
     """List users for assignee dropdown: token's user (or default when admin) and openshrimp user."""
     scoped_user_id, _ = auth
     current_user_id = scoped_user_id if scoped_user_id is not None else DEFAULT_USER_ID
-    current = session.get(User, current_user_id)
-    q = select(User).where(User.name == OPENSHRIMP_USER_NAME)
-    openshrimp = session.exec(q).first()
-    options = []
-    if current:
-        options.append({"id": current.id, "name": "Current user"})
-    if openshrimp and openshrimp.id != current_user_id:
-        options.append({"id": openshrimp.id, "name": "openshrimp user"})
-    return options
+    return _assignee_options(session, current_user_id)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -279,25 +292,15 @@ def dashboard(
             q_projects = q_projects.where(Project.user_id == scoped_user_id)
         projects = list(session.exec(q_projects))
 
-        current = session.get(User, default_user_id)
-        q_openshrimp = select(User).where(User.name == OPENSHRIMP_USER_NAME)
-        openshrimp = session.exec(q_openshrimp).first()
-        assignee_options = []
-        if current:
-            assignee_options.append({"id": current.id, "name": "Current user"})
-        if openshrimp and openshrimp.id != default_user_id:
-            assignee_options.append({"id": openshrimp.id, "name": "openshrimp user"})
+        assignee_options = _assignee_options(session, default_user_id)
 
-        q = select(Task).order_by(_priority_order_sql.desc(), Task.id)
-        if scoped_user_id is not None:
-            q = q.where(Task.user_id == scoped_user_id)
-        if project_id is not None:
-            q = q.where(Task.project_id == project_id)
-        tasks = [_task_to_read(t) for t in session.exec(q)]
+        tasks = _TASKS_ADAPTER.validate_python(
+            session.exec(_tasks_query(scoped_user_id, project_id)).all(), from_attributes=True
+        )
         tasks_by_status = {s.value: [] for s in TaskStatus}
         for t in tasks:
             tasks_by_status[t.status.value].append(t)
-        tasks_serialized = [t.model_dump(mode="json") for t in tasks]
+        tasks_json = _TASKS_ADAPTER.dump_json(tasks).decode().translate(_HTML_SAFE_JSON)
 
         return templates.TemplateResponse(
             "dashboard.html",
@@ -308,7 +311,7 @@ def dashboard(
                 "assignee_options": assignee_options,
                 "tasks": tasks,
                 "tasks_by_status": tasks_by_status,
-                "tasks_serialized": tasks_serialized,
+                "tasks_json": tasks_json,
                 "statuses": list(TaskStatus),
                 "selected_project_id": project_id,
                 "default_user_id": default_user_id,
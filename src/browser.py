@@ -1,66 +1,156 @@
 """Core browser session management and interactive actions.
 
-Thread-local persistent session: one browser/page per task thread. Sync entry point
-execute_action() dispatches to async implementation via the thread's event loop.
+Persistent session per task: one incognito context/page on a long-lived shared
+browser (browser_pool). All browser coroutines run on one event loop in a daemon
+thread; the sync entry point execute_action() submits to it from the caller's thread.
 """
 
 import asyncio
-import json
+import functools
 import os
 import re
 import threading
-from pathlib import Path
+import time
+from dataclasses import dataclass, field
 from urllib.parse import urlparse, urlunparse
 
-from pyppeteer import connect, launch
 from pyppeteer_stealth import stealth
 
-_local = threading.local()
-
-
-def _cookies_dir(domain: str) -> Path:
-    """Return path to cookie file for the current user + domain."""
-    import telegram_state
-    tg_user_id = telegram_state.get_telegram_user_id() or "global"
-    base = Path(os.environ.get("WORKSPACE_ROOT", "workspaces"))
-    path = base / str(tg_user_id) / "cookies"
-    path.mkdir(parents=True, exist_ok=True)
-    safe = re.sub(r"[^\w.-]", "_", domain)
-    return path / f"{safe}.json"
-
-
-async def _save_cookies(page) -> None:
+import browser_pool
+import cookie_store
+import telegram_state
+
+BROWSER_ACTION_TIMEOUT = int(os.environ.get("BROWSER_ACTION_TIMEOUT", "120"))  # seconds
+# networkidle* never settles on pages with long-polling ads/analytics; wait for the DOM
+# instead and then give client-rendered pages a short, bounded moment to fill in text.
+BROWSER_WAIT_UNTIL = os.environ.get("BROWSER_WAIT_UNTIL", "domcontentloaded").strip() or "domcontentloaded"
+BROWSER_SETTLE_TIMEOUT_MS = int(os.environ.get("BROWSER_SETTLE_TIMEOUT_MS", "5000"))
+EXTRACT_TEXT_MAX_CHARS = 15000
+# Captcha solving is opt-in: BROWSERLESS_SOLVE_CAPTCHAS=1 or a CAPSOLVER_API_KEY.
+_SOLVE_CAPTCHAS = (
+    os.environ.get("BROWSERLESS_SOLVE_CAPTCHAS", "").strip().lower() in ("1", "true", "yes")
+    or bool(os.environ.get("CAPSOLVER_API_KEY", "").strip())
+)
+_USER_AGENT = os.environ.get("BROWSER_USER_AGENT", "").strip() or None
+# Seconds a repeated navigate to the page the session is still on returns the previous
+# result instead of reloading. 0 (default) disables; read/inspect/wait keep it valid,
+# any other action drops it.
+BROWSER_CACHE_TTL = float(os.environ.get("BROWSER_CACHE_TTL", "0"))
+_CACHE_SAFE_ACTIONS = frozenset({"read", "inspect", "wait"})
+# Add a <link rel=preconnect> for the target origin before navigating to another origin,
+# so DNS/TCP/TLS overlaps with cookie loading. Off by default.
+BROWSER_PRECONNECT = os.environ.get("BROWSER_PRECONNECT", "").strip().lower() in ("1", "true", "yes")
+# Pages loaded at once by read_many (each in its own incognito context from the pool).
+BROWSER_READ_MANY_CONCURRENCY = max(1, int(os.environ.get("BROWSER_READ_MANY_CONCURRENCY", "4")))
+# Abort subresources the agent never sees (it only reads text / DOM selectors).
+# Stylesheets stay enabled by default: interactive flows need real layout and visibility.
+BROWSER_BLOCK_ASSETS = os.environ.get("BROWSER_BLOCK_ASSETS", "1").strip().lower() in ("1", "true", "yes")
+BLOCKED_RESOURCE_TYPES = frozenset(
+    t.strip().lower()
+    for t in os.environ.get("BROWSER_BLOCKED_RESOURCE_TYPES", "image,imageset,media,font").split(",")
+    if t.strip()
+)
+# Cookies are persisted at most this often per session (seconds); the latest jar per
+# domain is kept in memory meanwhile and flushed when the session closes.
+BROWSER_COOKIE_FLUSH_INTERVAL = float(os.environ.get("BROWSER_COOKIE_FLUSH_INTERVAL", "5"))
+
+
+@dataclass
+class _Session:
+    """Browser state for one task. Created in the caller's thread, used on the browser loop."""
+
+    tg_user_id: int | str
+    browser: object = None
+    context: object = None
+    page: object = None
+    # CDP session on page for browserless captcha events; created on first use
+    cdp: object = None
+    # (url, expires_at, result) of the last navigate; see BROWSER_CACHE_TTL
+    last_navigate: tuple | None = None
+    # domain -> cookies not yet written to disk / hash of what was last written
+    cookies_pending: dict = field(default_factory=dict)
+    cookies_written: dict = field(default_factory=dict)
+    cookies_flushed_at: float = 0.0
+
+
+# session key -> _Session (see _session_key)
+_sessions: dict[tuple, _Session] = {}
+_sessions_lock = threading.Lock()
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _session_key() -> tuple:
+    """One session per Telegram task; falls back to the calling thread outside the bot."""
+    task_id = telegram_state.get_task_id()
+    if task_id is not None:
+        return ("task", task_id)
+    return ("thread", threading.get_ident())
+
+
+async def _save_cookies(session: _Session, flush: bool = False) -> None:
+    """Record the page's cookies; write them out if *flush* or the flush interval has passed."""
+    page = session.page
     try:
         cookies = await page.cookies()
         domain = urlparse(page.url).netloc
         if domain:
-            _cookies_dir(domain).write_text(json.dumps(cookies))
+            session.cookies_pending[domain] = cookies
     except Exception:
         pass
+    if flush or time.monotonic() - session.cookies_flushed_at >= BROWSER_COOKIE_FLUSH_INTERVAL:
+        await _flush_cookies(session)
+
+
+async def _flush_cookies(session: _Session) -> None:
+    """Write pending cookie jars to the cookie store, skipping domains whose cookies did not change.
+
+    The SQLite write runs in a worker thread: every session shares the browser loop, and a
+    slow disk sync must not stall them. Jars stay in cookies_pending until written, so
+    _load_cookies keeps skipping their domains meanwhile (and a failed write is retried).
+    """
+    pending = dict(session.cookies_pending)
+    session.cookies_flushed_at = time.monotonic()
+    changed = {}
+    for domain, cookies in pending.items():
+        data = cookie_store.encode(cookies)
+        if session.cookies_written.get(domain) != hash(data):
+            changed[domain] = data
+    try:
+        if changed:
+            await asyncio.to_thread(cookie_store.save_many, session.tg_user_id, changed)
+    except Exception:
+        return
+    for domain, cookies in pending.items():
+        # Keep a jar that a newer page.cookies() replaced during the write.
+        if session.cookies_pending.get(domain) is cookies:
+            del session.cookies_pending[domain]
+    for domain, data in changed.items():
+        session.cookies_written[domain] = hash(data)
 
 
-async def _load_cookies(page, url: str) -> None:
+async def _load_cookies(session: _Session, url: str) -> None:
     try:
         domain = urlparse(url).netloc
         if not domain:
             return
-        path = _cookies_dir(domain)
-        if path.exists():
-            cookies = json.loads(path.read_text())
-            if cookies:
-                await page.setCookie(*cookies)
+        if domain in session.cookies_pending:
+            # The context already holds these; the stored jar may be older.
+            return
+        cookies = await asyncio.to_thread(cookie_store.load, session.tg_user_id, domain)
+        if cookies:
+            await session.page.setCookie(*cookies)
     except Exception:
         pass
 
 
+@functools.lru_cache(maxsize=1)
 def _browserless_ws_url() -> str:
+    """Build the browserless endpoint from env once; env does not change within a process."""
     raw = os.environ.get("BROWSERLESS_WS_URL", "http://localhost:3000").strip()
     token = os.environ.get("BROWSERLESS_TOKEN", "").strip()
     use_stealth = os.environ.get("BROWSERLESS_USE_STEALTH", "1").strip().lower() in ("1", "true", "yes")
-    solve_captchas = (
-        os.environ.get("BROWSERLESS_SOLVE_CAPTCHAS", "1").strip().lower() in ("1", "true", "yes")
-        or bool(os.environ.get("CAPSOLVER_API_KEY", "").strip())
-    )
     parsed = urlparse(raw)
     if parsed.scheme == "http":
         netloc = parsed.netloc or "localhost:3000"
@@ -76,28 +166,30 @@ def _browserless_ws_url() -> str:
     query = parsed.query
     if token:
         query = f"{query}&token={token}" if query else f"token={token}"
-    if solve_captchas:
+    if _SOLVE_CAPTCHAS:
         query = f"{query}&solveCaptchas=true" if query else "solveCaptchas=true"
     return urlunparse((scheme, netloc, path, parsed.params, query, parsed.fragment))
 
 
 def _get_loop() -> asyncio.AbstractEventLoop:
-    """Create or return the thread's persistent event loop."""
-    if not hasattr(_local, "loop") or _local.loop is None or _local.loop.is_closed():
-        _local.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(_local.loop)
-    return _local.loop
-
-
-async def _maybe_solve_captcha(page) -> None:
-    solve_captchas = (
-        os.environ.get("BROWSERLESS_SOLVE_CAPTCHAS", "1").strip().lower() in ("1", "true", "yes")
-        or bool(os.environ.get("CAPSOLVER_API_KEY", "").strip())
-    )
-    if not solve_captchas:
+    """Return the shared browser event loop, starting its daemon thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="browser-loop", daemon=True).start()
+        return _loop
+
+
+async def _maybe_solve_captcha(session: _Session) -> None:
+    """Solve a browserless-detected captcha; waits at most 3s, less once the page has loaded."""
+    if not _SOLVE_CAPTCHAS:
         return
+    page = session.page
     try:
-        cdp = await page.target.createCDPSession()
+        if session.cdp is None:
+            session.cdp = await page.target.createCDPSession()
+        cdp = session.cdp
         captcha_future = asyncio.get_running_loop().create_future()
 
         def _on_captcha_found(*_args):
@@ -105,133 +197,259 @@ async def _maybe_solve_captcha(page) -> None:
                 captcha_future.set_result(True)
 
         cdp.on("Browserless.captchaFound", _on_captcha_found)
+
+        async def _wait_loaded():
+            try:
+                await page.waitForFunction("() => document.readyState === 'complete'", {"timeout": 3000})
+            except Exception:
+                pass
+
+        page_loaded = asyncio.ensure_future(_wait_loaded())
         try:
-            await asyncio.wait_for(captcha_future, timeout=3.0)
-        except asyncio.TimeoutError:
-            pass
-        else:
+            done, _pending = await asyncio.wait(
+                {captcha_future, page_loaded}, timeout=3.0, return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            # Also runs when the action is cancelled, so no waiter outlives it.
+            cdp.remove_listener("Browserless.captchaFound", _on_captcha_found)
+            captcha_future.cancel()
+            page_loaded.cancel()
+        if captcha_future in done:
             await cdp.send("Browserless.solveCaptcha")
             await asyncio.sleep(2)
     except Exception:
         pass
 
 
-def _extract_text_js() -> str:
-    return """
-    () => {
-        const body = document.body;
-        if (!body) return '';
-        const clone = body.cloneNode(true);
-        const scripts = clone.querySelectorAll('script, style, nav, footer, header');
-        scripts.forEach(el => el.remove());
-        return (clone.innerText || clone.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, 15000);
-    }
-    """
+async def _preconnect(page, url: str) -> None:
+    """Hint the browser to open a connection to *url*'s origin (see BROWSER_PRECONNECT)."""
+    if not BROWSER_PRECONNECT:
+        return
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    if page.url.startswith(origin):
+        return
+    try:
+        await page.evaluate(
+            """(origin) => {
+                const link = document.createElement('link');
+                link.rel = 'preconnect';
+                link.href = origin;
+                (document.head || document.documentElement).appendChild(link);
+            }""",
+            origin,
+        )
+    except Exception:
+        pass
 
 
-async def _extract_text(page) -> str:
-    result = await page.evaluate(_extract_text_js())
-    return result or "(no extractable text)"
-
-
-def _extract_dom_summary_js() -> str:
-    return """
-    () => {
-        const interactive = ['a', 'button', 'input', 'select', 'textarea'];
-        const out = [];
-        const walk = (el, depth) => {
-            if (depth > 8 || out.length >= 500) return;
-            const tag = (el.tagName || '').toLowerCase();
-            const id = el.id ? '#' + el.id : '';
-            const cls = el.className && typeof el.className === 'string'
-                ? '.' + el.className.trim().split(/\\s+/).slice(0, 2).join('.')
-                : '';
-            const sel = tag + id + (cls || '');
-            const attrs = {};
-            if (el.name) attrs.name = el.name;
-            if (el.placeholder) attrs.placeholder = el.placeholder;
-            if (el.href) attrs.href = el.href;
-            if (el.type) attrs.type = el.type;
-            const summary = { tag, selector: sel };
-            if (Object.keys(attrs).length) summary.attrs = attrs;
-            if (interactive.includes(tag) || id || el.getAttribute('role')) {
-                out.push(summary);
+async def _wait_for_content(page) -> None:
+    """Wait (bounded) until <body> has some text; short pages simply time out and proceed."""
+    if BROWSER_WAIT_UNTIL.startswith("networkidle") or BROWSER_SETTLE_TIMEOUT_MS <= 0:
+        return
+    try:
+        await page.waitForFunction(
+            "() => document.body && document.body.textContent.length > 200",
+            {"timeout": BROWSER_SETTLE_TIMEOUT_MS, "polling": 100},
+        )
+    except Exception:
+        pass
+
+
+# Single TreeWalker pass: no cloneNode(true) of the whole body and no innerText layout
+# pass. Skipped elements, [hidden] and aria-hidden subtrees are rejected whole. Inline
+# elements are stepped through, so their text joins without separators (Hel<b>lo</b>,
+# $<span>12</span>.99); block elements and <br> are visited, and the walk descends into
+# and climbs out of blocks itself, adding a space at each boundary (no per-text-node
+# ancestor lookups). The walk stops once the character budget (plus slack for collapsed
+# whitespace) is met; whitespace collapsing and the final cut happen in _read_page. The
+# title comes back in the same evaluate so callers need no separate page.title() round-trip.
+_EXTRACT_TEXT_JS = """
+(maxChars) => {
+    const body = document.body;
+    if (!body) return { text: '', title: document.title };
+    const skip = new Set([
+        'SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'SVG', 'svg', 'NAV', 'FOOTER', 'HEADER',
+    ]);
+    const blocks = new Set([
+        'ADDRESS', 'ARTICLE', 'ASIDE', 'BLOCKQUOTE', 'BR', 'DD', 'DETAILS', 'DIALOG', 'DIV',
+        'DL', 'DT', 'FIELDSET', 'FIGCAPTION', 'FIGURE', 'FORM', 'H1', 'H2', 'H3', 'H4', 'H5',
+        'H6', 'HR', 'LI', 'MAIN', 'OL', 'P', 'PRE', 'SECTION', 'SUMMARY', 'TABLE', 'TBODY',
+        'TD', 'TFOOT', 'TH', 'THEAD', 'TR', 'UL',
+    ]);
+    const walker = document.createTreeWalker(
+        body, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+            acceptNode(node) {
+                if (node.nodeType === Node.TEXT_NODE) return NodeFilter.FILTER_ACCEPT;
+                if (skip.has(node.nodeName) || node.hidden
+                        || node.getAttribute('aria-hidden') === 'true') {
+                    return NodeFilter.FILTER_REJECT;
+                }
+                return blocks.has(node.nodeName) ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_SKIP;
             }
-            for (const child of el.children || []) walk(child, depth + 1);
-        };
-        walk(document.body || document.documentElement, 0);
-        return JSON.stringify(out.slice(0, 200));
+        });
+    const budget = maxChars * 2;
+    const parts = [];
+    let total = 0;
+    let node = walker.firstChild();
+    while (node && total < budget) {
+        if (node.nodeType === Node.TEXT_NODE) {
+            parts.push(node.nodeValue);
+            total += node.nodeValue.length;
+        } else {
+            parts.push(' ');  // start of a block, or <br>
+            node = walker.firstChild();
+            if (node) continue;
+        }
+        // Next sibling; parentNode() climbs out of finished blocks (never past body).
+        node = walker.nextSibling();
+        while (!node && walker.parentNode()) {
+            parts.push(' ');
+            node = walker.nextSibling();
+        }
     }
-    """
+    return { text: parts.join(''), title: document.title };
+}
+"""
+
+# One native selector match (document order) instead of a recursive JS walk; selector
+# strings are only built for the elements that end up in the summary.
+_EXTRACT_DOM_SUMMARY_JS = """
+() => {
+    const els = document.querySelectorAll('a,button,input,select,textarea,[role],[id]');
+    const out = [];
+    for (let i = 0; i < els.length && out.length < 200; i++) {
+        const el = els[i];
+        const tag = el.tagName.toLowerCase();
+        const id = el.id ? '#' + el.id : '';
+        const cls = typeof el.className === 'string' && el.className.trim()
+            ? '.' + el.className.trim().split(/\\s+/).slice(0, 2).join('.')
+            : '';
+        const summary = { tag, selector: tag + id + cls };
+        const attrs = {};
+        if (el.name) attrs.name = el.name;
+        if (el.placeholder) attrs.placeholder = el.placeholder;
+        if (el.href) attrs.href = el.href;
+        if (el.type) attrs.type = el.type;
+        if (Object.keys(attrs).length) summary.attrs = attrs;
+        out.push(summary);
+    }
+    return JSON.stringify(out);
+}
+"""
+
+# Window properties the helpers above are registered under on every new document
+# (non-enumerable), so each call sends a name instead of the whole function source.
+_EXTRACTOR_NAME = "__shrimpExtractText"
+_DOM_SUMMARY_NAME = "__shrimpDomSummary"
+
+_INSTALL_HELPERS_JS = (
+    "() => { const define = (name, value) => Object.defineProperty(window, name, "
+    "{ value, configurable: true }); "
+    f"define({_EXTRACTOR_NAME!r}, {_EXTRACT_TEXT_JS.strip()}); "
+    f"define({_DOM_SUMMARY_NAME!r}, {_EXTRACT_DOM_SUMMARY_JS.strip()}); }}"
+)
+
+_CALL_HELPER_JS = "(name, ...args) => { const f = window[name]; return f ? f(...args) : null; }"
+
+_WS_RE = re.compile(r"\s+")
+
+
+async def _call_helper(page, name: str, source: str, *args):
+    """Call a helper registered by _prepare_page; fall back to sending *source*
+    (about:blank, or documents loaded before the page was prepared)."""
+    result = await page.evaluate(_CALL_HELPER_JS, name, *args)
+    if result is None:
+        result = await page.evaluate(source, *args)
+    return result
+
+
+async def _read_page(page) -> tuple[str, str]:
+    """Return (visible text, title) of the page in one round-trip."""
+    result = await _call_helper(page, _EXTRACTOR_NAME, _EXTRACT_TEXT_JS, EXTRACT_TEXT_MAX_CHARS) or {}
+    text = _WS_RE.sub(" ", result.get("text") or "").strip()[:EXTRACT_TEXT_MAX_CHARS]
+    return text or "(no extractable text)", result.get("title") or ""
 
 
 async def _extract_dom_summary(page) -> str:
     try:
-        return await page.evaluate(_extract_dom_summary_js())
+        return await _call_helper(page, _DOM_SUMMARY_NAME, _EXTRACT_DOM_SUMMARY_JS)
     except Exception as e:
         return f"DOM summary error: {e!r}"
 
 
-async def _get_or_create_session():
-    """Connect browser and create page if needed; verify page is alive."""
-    if getattr(_local, "browser", None) and getattr(_local, "page", None):
-        try:
-            await _local.page.evaluate("1")
-            return _local.browser, _local.page
-        except Exception:
-            pass
-    if getattr(_local, "page", None):
+async def _get_or_create_session(session: _Session):
+    """Open an incognito context + page on the shared browser if needed; verify page is alive.
+
+    The browser connection is reused across sessions and pages come pre-stealthed from
+    browser_pool's warm queue; each session gets its own incognito context so cookies
+    never leak between tasks.
+    """
+    if session.browser and session.page:
         try:
-            await _local.page.close()
+            await session.page.evaluate("1")
+            return session.browser, session.page
         except Exception:
             pass
-        _local.page = None
-    if getattr(_local, "browser", None):
+    await _close_context(session)
+
+    session.context, session.page = await browser_pool.acquire_page(_browserless_ws_url(), _prepare_page)
+    session.browser = session.context.browser
+    return session.browser, session.page
+
+
+async def _prepare_page(page) -> None:
+    """One-time page setup (stealth, viewport, page helpers, asset blocking); runs ahead of use for warm pages."""
+    await stealth(page, user_agent=_USER_AGENT)
+    await page.setViewport({"width": 1280, "height": 800})
+    await page.evaluateOnNewDocument(_INSTALL_HELPERS_JS)
+    if BROWSER_BLOCK_ASSETS and BLOCKED_RESOURCE_TYPES:
+        await _block_assets(page)
+
+
+async def _block_assets(page) -> None:
+    """Intercept requests on *page* and abort those in BLOCKED_RESOURCE_TYPES."""
+
+    async def _route(request) -> None:
         try:
-            await _local.browser.close()
+            if request.resourceType in BLOCKED_RESOURCE_TYPES:
+                await request.abort()
+            else:
+                await request.continue_()
         except Exception:
-            pass
-        _local.browser = None
+            pass  # request already handled or page gone
 
-    ws_url = _browserless_ws_url()
-    try:
-        _local.browser = await connect(browserWSEndpoint=ws_url)
-    except Exception as e:
-        try:
-            _local.browser = await launch(
-                headless=True,
-                args=["--no-sandbox", "--disable-setuid-sandbox"],
-            )
-        except Exception as e2:
-            raise RuntimeError(f"Failed to connect to browser: {e!r}; {e2!r}") from e2
+    await page.setRequestInterception(True)
+    page.on("request", lambda request: asyncio.ensure_future(_route(request)))
 
-    _local.page = await _local.browser.newPage()
-    user_agent = os.environ.get("BROWSER_USER_AGENT", "").strip() or None
-    await stealth(_local.page, user_agent=user_agent)
-    await _local.page.setViewport({"width": 1280, "height": 800})
-    return _local.browser, _local.page
+
+async def _close_context(session: _Session) -> None:
+    """Close the session's page and incognito context; the shared browser stays connected.
+
+    Both closes run concurrently and errors are swallowed; cancellation still propagates.
+    """
+    page, context = session.page, session.context
+    session.browser = session.context = session.page = session.cdp = None
+    closes = [obj.close() for obj in (page, context) if obj is not None]
+    if closes:
+        await asyncio.gather(*closes, return_exceptions=True)
+
+
+async def _end_session(session: _Session) -> None:
+    await _flush_cookies(session)
+    await _close_context(session)
 
 
 def close_session() -> None:
-    """Close browser and page for this thread. Call after task ends (e.g. from telegram_bot)."""
-    loop = getattr(_local, "loop", None)
-    if loop is None or loop.is_closed():
+    """Close page and context for this task. Call after task ends (e.g. from telegram_bot)."""
+    with _sessions_lock:
+        session = _sessions.pop(_session_key(), None)
+    if session is None or _loop is None or _loop.is_closed():
         return
-    async def _close():
-        if getattr(_local, "page", None):
-            try:
-                await _local.page.close()
-            except Exception:
-                pass
-            _local.page = None
-        if getattr(_local, "browser", None):
-            try:
-                await _local.browser.close()
-            except Exception:
-                pass
-            _local.browser = None
     try:
-        loop.run_until_complete(_close())
+        asyncio.run_coroutine_threadsafe(_end_session(session), _loop).result(timeout=10)
     except Exception:
         pass
 
@@ -240,114 +458,181 @@ def _result(ok: bool, data: str, url: str = "", title: str = "") -> dict:
     return {"ok": ok, "data": data, "url": url, "title": title}
 
 
-async def _run_action(
-    action: str,
-    url: str = "",
-    selector: str = "",
-    text: str = "",
-    key: str = "",
-    direction: str = "down",
-    amount: int = 500,
-    timeout_ms: int = 10000,
-) -> dict:
-    browser, page = await _get_or_create_session()
+async def _fail(page, message: str, url: str | None = None) -> dict:
+    """Error result; the title is only fetched here, so successful actions never pay for it."""
+    try:
+        title = await page.title()
+    except Exception:
+        title = ""
+    return _result(False, message, page.url if url is None else url, title)
+
+
+async def _navigate(session: _Session, page, url: str = "", **_) -> dict:
+    if not url:
+        return await _fail(page, "navigate requires url")
+    await _preconnect(page, url)
+    await _load_cookies(session, url)
+    await page.goto(url, {"waitUntil": BROWSER_WAIT_UNTIL, "timeout": 30000})
+    await _wait_for_content(page)
+    await _maybe_solve_captcha(session)
+    await _save_cookies(session)
+    content, title = await _read_page(page)
+    return _result(True, content, page.url, title)
+
+
+async def _read(session: _Session, page, **_) -> dict:
+    content, title = await _read_page(page)
+    return _result(True, content, page.url, title)
+
+
+async def _inspect(session: _Session, page, **_) -> dict:
+    summary = await _extract_dom_summary(page)
+    return _result(True, summary, page.url, await page.title())
+
+
+async def _click(session: _Session, page, selector: str = "", timeout_ms: int = 10000, **_) -> dict:
+    if not selector:
+        return await _fail(page, "click requires selector")
+    await page.click(selector, timeout=timeout_ms or 10000)
+    await asyncio.sleep(0.5)
+    await _save_cookies(session)
+    content, title = await _read_page(page)
+    return _result(True, f"Clicked {selector}.\n\n{content}", page.url, title)
+
+
+async def _type(session: _Session, page, selector: str = "", text: str = "", timeout_ms: int = 10000, **_) -> dict:
+    if not selector:
+        return await _fail(page, "type requires selector")
+    await page.click(selector, timeout=timeout_ms or 10000)
+    await page.keyboard.type(text, delay=50)
+    return _result(True, f"Typed into {selector}.", page.url, await page.title())
+
+
+async def _press_key(session: _Session, page, key: str = "", **_) -> dict:
+    if not key:
+        return await _fail(page, "press_key requires key (e.g. Enter, Tab, Escape)")
+    await page.keyboard.press(key)
+    await _save_cookies(session)
+    return _result(True, f"Pressed {key}.", page.url, await page.title())
+
+
+async def _scroll(session: _Session, page, direction: str = "down", amount: int = 500, **_) -> dict:
+    dx = 0
+    dy = amount if direction == "down" else (-amount if direction == "up" else amount)
+    if direction in ("left", "right"):
+        dx = amount if direction == "right" else -amount
+        dy = 0
+    await page.evaluate(f"window.scrollBy({{ left: {dx}, top: {dy} }})")
+    await asyncio.sleep(0.3)
+    content, title = await _read_page(page)
+    return _result(True, content, page.url, title)
+
+
+async def _wait(session: _Session, page, selector: str = "", timeout_ms: int = 10000, **_) -> dict:
+    if not selector:
+        return await _fail(page, "wait requires selector")
+    await page.waitForSelector(selector, {"timeout": timeout_ms or 10000})
+    return _result(True, f"Element {selector} appeared.", page.url, await page.title())
+
+
+async def _clear_cookies(session: _Session, page, **_) -> dict:
+    domain = urlparse(page.url).netloc
+    if not domain:
+        return await _fail(page, "No domain available to clear cookies for.")
+    session.cookies_pending.pop(domain, None)
+    session.cookies_written.pop(domain, None)
+    await asyncio.to_thread(cookie_store.delete, session.tg_user_id, domain)
+    return _result(True, f"Cookies cleared for {domain}.", page.url, await page.title())
+
+
+# action name -> handler(session, page, **action args); errors are reported as
+# "<Action> error: ..." with the URL the page was on before the action.
+_ACTIONS = {
+    "navigate": _navigate,
+    "read": _read,
+    "inspect": _inspect,
+    "click": _click,
+    "type": _type,
+    "press_key": _press_key,
+    "scroll": _scroll,
+    "wait": _wait,
+    "clear_cookies": _clear_cookies,
+}
+
+
+async def _run_action(session: _Session, action: str, **kwargs) -> dict:
+    _browser, page = await _get_or_create_session(session)
+    handler = _ACTIONS.get(action)
+    if handler is None:
+        return await _fail(page, f"Unknown action: {action}")
     current_url = page.url
-    current_title = await page.title()
-
-    if action == "navigate":
-        if not url:
-            return _result(False, "navigate requires url", current_url, current_title)
-        try:
-            await _load_cookies(page, url)
-            await page.goto(url, {"waitUntil": "networkidle2", "timeout": 30000})
-            await _maybe_solve_captcha(page)
-            await _save_cookies(page)
-            content = await _extract_text(page)
-            return _result(True, content, page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Navigate error: {e!r}", current_url, current_title)
-
-    if action == "read":
-        try:
-            content = await _extract_text(page)
-            return _result(True, content, page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Read error: {e!r}", current_url, current_title)
-
-    if action == "inspect":
-        try:
-            summary = await _extract_dom_summary(page)
-            return _result(True, summary, page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Inspect error: {e!r}", current_url, current_title)
-
-    if action == "click":
-        if not selector:
-            return _result(False, "click requires selector", current_url, current_title)
-        try:
-            await page.click(selector, timeout=timeout_ms or 10000)
-            await asyncio.sleep(0.5)
-            await _save_cookies(page)
-            content = await _extract_text(page)
-            return _result(True, f"Clicked {selector}.\n\n{content}", page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Click error: {e!r}", current_url, current_title)
-
-    if action == "type":
-        if not selector:
-            return _result(False, "type requires selector", current_url, current_title)
-        try:
-            await page.click(selector, timeout=timeout_ms or 10000)
-            await page.keyboard.type(text, delay=50)
-            return _result(True, f"Typed into {selector}.", page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Type error: {e!r}", current_url, current_title)
-
-    if action == "press_key":
-        if not key:
-            return _result(False, "press_key requires key (e.g. Enter, Tab, Escape)", current_url, current_title)
-        try:
-            await page.keyboard.press(key)
-            await _save_cookies(page)
-            return _result(True, f"Pressed {key}.", page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Press key error: {e!r}", current_url, current_title)
+    try:
+        return await handler(session, page, **kwargs)
+    except Exception as e:
+        label = action.replace("_", " ").capitalize()
+        return await _fail(page, f"{label} error: {e!r}", current_url)
 
-    if action == "scroll":
-        try:
-            dx = 0
-            dy = amount if direction == "down" else (-amount if direction == "up" else amount)
-            if direction in ("left", "right"):
-                dx = amount if direction == "right" else -amount
-                dy = 0
-            await page.evaluate(f"window.scrollBy({{ left: {dx}, top: {dy} }})")
-            await asyncio.sleep(0.3)
-            content = await _extract_text(page)
-            return _result(True, content, page.url, await page.title())
-        except Exception as e:
-            return _result(False, f"Scroll error: {e!r}", current_url, current_title)
 
-    if action == "wait":
-        if not selector:
-            return _result(False, "wait requires selector", current_url, current_title)
+async def _read_one(tg_user_id: int | str, url: str, sem: asyncio.Semaphore) -> dict:
+    """Load *url* in a throwaway context (same cookie jar as the user's session) and extract text."""
+    async with sem:
         try:
-            t = timeout_ms or 10000
-            await page.waitForSelector(selector, {"timeout": t})
-            return _result(True, f"Element {selector} appeared.", page.url, await page.title())
+            context, page = await browser_pool.acquire_page(_browserless_ws_url(), _prepare_page)
         except Exception as e:
-            return _result(False, f"Wait error: {e!r}", current_url, current_title)
-
-    if action == "clear_cookies":
+            return _result(False, f"Navigate error: {e!r}", url)
+        tmp = _Session(tg_user_id=tg_user_id, browser=context.browser, context=context, page=page)
         try:
-            domain = urlparse(page.url).netloc
-            if domain:
-                _cookies_dir(domain).unlink(missing_ok=True)
-                return _result(True, f"Cookies cleared for {domain}.", page.url, await page.title())
-            return _result(False, "No domain available to clear cookies for.", current_url, current_title)
+            await _preconnect(page, url)
+            await _load_cookies(tmp, url)
+            await page.goto(url, {"waitUntil": BROWSER_WAIT_UNTIL, "timeout": 30000})
+            await _wait_for_content(page)
+            await _maybe_solve_captcha(tmp)
+            await _save_cookies(tmp, flush=True)
+            content, title = await _read_page(page)
+            return _result(True, content, page.url, title)
         except Exception as e:
-            return _result(False, f"Clear cookies error: {e!r}", current_url, current_title)
-
-    return _result(False, f"Unknown action: {action}", current_url, current_title)
+            return _result(False, f"Navigate error: {e!r}", url)
+        finally:
+            await _close_context(tmp)
+
+
+async def _read_many(tg_user_id: int | str, urls: list[str], session: _Session | None = None) -> list[dict]:
+    if session is not None:
+        # Reads load cookies from the cookie store; bring it up to date with the session first.
+        await _flush_cookies(session)
+    sem = asyncio.Semaphore(BROWSER_READ_MANY_CONCURRENCY)
+    tasks = [asyncio.ensure_future(_read_one(tg_user_id, url, sem)) for url in urls]
+    _done, pending = await asyncio.wait(tasks, timeout=BROWSER_ACTION_TIMEOUT)
+    for task in pending:
+        task.cancel()
+    # Let cancelled reads close their contexts before returning.
+    await asyncio.gather(*pending, return_exceptions=True)
+    return [
+        task.result() if task.done() and not task.cancelled()
+        else _result(False, f"Timed out after {BROWSER_ACTION_TIMEOUT}s", url)
+        for task, url in zip(tasks, urls)
+    ]
+
+
+def read_many(urls: list[str]) -> list[dict]:
+    """Sync entry: load several URLs concurrently and return one {ok, data, url, title} per URL.
+
+    Independent of the task's interactive session (its page is left untouched); cookies
+    are shared with it through the per-user cookie store. URLs still loading when
+    BROWSER_ACTION_TIMEOUT expires are reported as timed out; finished ones are kept.
+    """
+    urls = [u for u in urls if u]
+    if not urls:
+        return []
+    tg_user_id = telegram_state.get_telegram_user_id() or "global"
+    with _sessions_lock:
+        session = _sessions.get(_session_key())
+    future = asyncio.run_coroutine_threadsafe(_read_many(tg_user_id, urls, session), _get_loop())
+    try:
+        return future.result(timeout=BROWSER_ACTION_TIMEOUT + 15)
+    except TimeoutError:
+        future.cancel()
+        return [_result(False, f"Timed out after {BROWSER_ACTION_TIMEOUT}s", u) for u in urls]
 
 
 def execute_action(
@@ -360,10 +645,20 @@ def execute_action(
     amount: int = 500,
     timeout_ms: int = 10000,
 ) -> dict:
-    """Sync entry: run the given browser action in this thread's session. Returns {ok, data, url, title}."""
-    loop = _get_loop()
-    return loop.run_until_complete(
+    """Sync entry: run the given browser action in this task's session. Returns {ok, data, url, title}."""
+    session_key = _session_key()
+    with _sessions_lock:
+        session = _sessions.get(session_key)
+        if session is None:
+            session = _Session(tg_user_id=telegram_state.get_telegram_user_id() or "global")
+            _sessions[session_key] = session
+    if action == "navigate" and BROWSER_CACHE_TTL > 0 and session.last_navigate:
+        cached_url, expires_at, cached = session.last_navigate
+        if cached_url == url and time.monotonic() < expires_at:
+            return dict(cached)
+    future = asyncio.run_coroutine_threadsafe(
         _run_action(
+            session,
             action=action,
             url=url,
             selector=selector,
@@ -372,5 +667,18 @@ def execute_action(
             direction=direction,
             amount=amount,
             timeout_ms=timeout_ms,
-        )
+        ),
+        _get_loop(),
     )
+    try:
+        result = future.result(timeout=BROWSER_ACTION_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        session.last_navigate = None
+        return _result(False, f"Browser action {action!r} timed out after {BROWSER_ACTION_TIMEOUT}s")
+    if action == "navigate":
+        ok = BROWSER_CACHE_TTL > 0 and result.get("ok")
+        session.last_navigate = (url, time.monotonic() + BROWSER_CACHE_TTL, dict(result)) if ok else None
+    elif action not in _CACHE_SAFE_ACTIONS:
+        session.last_navigate = None
+    return result
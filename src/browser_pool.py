@@ -0,0 +1,152 @@
+"""Long-lived browser connection and warm pages shared by browser sessions.
+
+Connecting to browserless (or launching a local Chrome) is the slowest part of a
+browser action, so the Browser is created once and reused; sessions only open and
+close their own incognito context + page. A few pages are prepared ahead of time
+(stealth, viewport, request blocking) so a new session does not pay for that setup.
+All functions here run on the browser loop owned by browser.py.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+from typing import Awaitable, Callable
+
+from pyppeteer import connect, launch
+
+logger = logging.getLogger(__name__)
+
+# Prepared (context, page) pairs kept ready; 0 disables the warm pool.
+BROWSER_WARM_PAGES = max(0, int(os.environ.get("BROWSER_WARM_PAGES", "2")))
+
+_browser = None
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = asyncio.Lock()
+_warm: asyncio.Queue | None = None
+_filling = 0
+_tasks: set[asyncio.Task] = set()
+
+
+def _is_alive(browser) -> bool:
+    """True if the browser's CDP websocket is still open."""
+    conn = getattr(browser, "_connection", None)
+    return bool(conn is not None and getattr(conn, "_connected", False))
+
+
+async def get_browser(ws_url: str):
+    """Return the shared Browser, (re)connecting if it is gone."""
+    global _browser, _loop
+    if _browser is not None and _is_alive(_browser):
+        return _browser
+    async with _lock:
+        if _browser is not None and _is_alive(_browser):
+            return _browser
+        try:
+            browser = await connect(browserWSEndpoint=ws_url)
+        except Exception as e:
+            try:
+                browser = await launch(
+                    headless=True,
+                    args=["--no-sandbox", "--disable-setuid-sandbox"],
+                )
+            except Exception as e2:
+                raise RuntimeError(f"Failed to connect to browser: {e!r}; {e2!r}") from e2
+        _browser, _loop = browser, asyncio.get_running_loop()
+        logger.info("Browser connected (%s)", "remote" if browser.process is None else "local")
+        return browser
+
+
+async def _new_page(ws_url: str, prepare: Callable[[object], Awaitable[None]]) -> tuple:
+    browser = await get_browser(ws_url)
+    context = await browser.createIncognitoBrowserContext()
+    try:
+        page = await context.newPage()
+        await prepare(page)
+    except BaseException:
+        await _close_quietly(context)
+        raise
+    return context, page
+
+
+async def _close_quietly(context) -> None:
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+def _refill(ws_url: str, prepare: Callable[[object], Awaitable[None]]) -> None:
+    """Top the warm queue back up to BROWSER_WARM_PAGES in the background."""
+    global _filling
+
+    async def _fill_one() -> None:
+        global _filling
+        try:
+            pair = await _new_page(ws_url, prepare)
+            _warm.put_nowait(pair)
+        except Exception as e:
+            logger.debug("Warm page creation failed: %s", e)
+        finally:
+            _filling -= 1
+
+    while _warm.qsize() + _filling < BROWSER_WARM_PAGES:
+        _filling += 1
+        task = asyncio.ensure_future(_fill_one())
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+
+async def acquire_page(ws_url: str, prepare: Callable[[object], Awaitable[None]]) -> tuple:
+    """Return a prepared (incognito context, page) for one session.
+
+    Pages are single-use: the caller closes the context when the session ends, so
+    cookies never carry over between tasks. Stale warm pages (browser reconnected or
+    page closed) are discarded and a fresh one is created instead.
+    """
+    global _warm
+    if _warm is None:
+        _warm = asyncio.Queue()
+    pair = None
+    while pair is None and not _warm.empty():
+        context, page = _warm.get_nowait()
+        if context.browser is _browser and _is_alive(_browser) and not page.isClosed():
+            pair = (context, page)
+        else:
+            await _close_quietly(context)
+    if pair is None:
+        pair = await _new_page(ws_url, prepare)
+    _refill(ws_url, prepare)
+    return pair
+
+
+async def close_browser() -> None:
+    """Drop warm pages and the shared Browser (disconnect remote, close local)."""
+    global _browser
+    contexts = []
+    while _warm is not None and not _warm.empty():
+        contexts.append(_warm.get_nowait()[0])
+    await asyncio.gather(*(c.close() for c in contexts), return_exceptions=True)
+    browser, _browser = _browser, None
+    if browser is None:
+        return
+    try:
+        if browser.process is None:
+            await browser.disconnect()
+        else:
+            await browser.close()
+    except Exception:
+        pass
+
+
+def _close_at_exit() -> None:
+    """atexit hook: release the Browser on the loop it belongs to."""
+    if _browser is None or _loop is None or _loop.is_closed() or not _loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(close_browser(), _loop).result(timeout=5)
+    except Exception:
+        pass
+
+
+atexit.register(_close_at_exit)
@@ -0,0 +1,98 @@
+"""Per-user cookie jars persisted in SQLite (<WORKSPACE_ROOT>/<user>/cookies.db).
+
+One row per domain holding the cookie list pyppeteer returns from page.cookies(), as JSON. Writes
+for several domains go out in one transaction; WAL keeps them from blocking readers.
+Cookie files from the older one-JSON-file-per-domain layout are still read when a
+domain has no row yet. browser.py calls these from worker threads so disk I/O stays off
+its shared event loop; _lock serializes access to the connections.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Same mapping as re.sub(r"[^\w.-]", "_", ...) for ASCII, which is what URL hosts contain.
+_SAFE_FILENAME = str.maketrans({c: "_" for c in map(chr, range(128)) if not (c.isalnum() or c in "_.-")})
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+# tg_user_id (as str) -> open connection
+_conns: dict[str, sqlite3.Connection] = {}
+_lock = threading.Lock()
+
+
+def _user_dir(tg_user_id: int | str) -> Path:
+    return Path(os.environ.get("WORKSPACE_ROOT", "workspaces")) / str(tg_user_id)
+
+
+def _legacy_file(tg_user_id: int | str, domain: str) -> Path:
+    return _user_dir(tg_user_id) / "cookies" / f"{domain.translate(_SAFE_FILENAME)}.json"
+
+
+def _connect(tg_user_id: int | str) -> sqlite3.Connection:
+    key = str(tg_user_id)
+    conn = _conns.get(key)
+    if conn is None:
+        path = _user_dir(key)
+        path.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path / "cookies.db", isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cookies ("
+            "domain TEXT PRIMARY KEY, payload BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        _conns[key] = conn
+    return conn
+
+
+def encode(cookies: list) -> bytes:
+    """Serialize a cookie list for save_many (orjson when installed, else stdlib json)."""
+    if orjson is not None:
+        return orjson.dumps(cookies)
+    return json.dumps(cookies).encode("utf-8")
+
+
+def load(tg_user_id: int | str, domain: str) -> list:
+    """Return the stored cookies for *domain* (empty list if none)."""
+    with _lock:
+        row = _connect(tg_user_id).execute(
+            "SELECT payload FROM cookies WHERE domain = ?", (domain,)
+        ).fetchone()
+    if row is not None:
+        return _loads(row[0])
+    legacy = _legacy_file(tg_user_id, domain)
+    if legacy.exists():
+        return _loads(legacy.read_bytes())
+    return []
+
+
+def save_many(tg_user_id: int | str, payloads: dict[str, bytes]) -> None:
+    """Upsert {domain: encode(cookie list)} in one transaction."""
+    if not payloads:
+        return
+    now = time.time()
+    with _lock:
+        conn = _connect(tg_user_id)
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO cookies (domain, payload, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET payload = excluded.payload, updated = excluded.updated",
+                [(domain, payload, now) for domain, payload in payloads.items()],
+            )
+
+
+def delete(tg_user_id: int | str, domain: str) -> None:
+    """Forget the cookies stored for *domain* (including a legacy file)."""
+    with _lock:
+        _connect(tg_user_id).execute("DELETE FROM cookies WHERE domain = ?", (domain,))
+    _legacy_file(tg_user_id, domain).unlink(missing_ok=True)
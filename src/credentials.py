@@ -7,28 +7,34 @@ environment variable.
 
 from __future__ import annotations
 
+import functools
 import os
+import time
 from datetime import datetime
 from typing import Iterable
 
 from cryptography.fernet import Fernet, InvalidToken
-from sqlmodel import Session, select
+from sqlmodel import select
 
 import db as _db
 from models import Credential
 
 _VAULT_KEY_ENV = "OPENSHRIMP_VAULT_KEY"
-_fernet: Fernet | None = None
+# Seconds a decrypted secret is served from memory; 0 disables. Writes through this
+# module invalidate immediately; changes made by another process show up after the TTL.
+SECRET_CACHE_TTL = float(os.environ.get("OPENSHRIMP_SECRET_CACHE_TTL", "60"))
 
+# (project_id, user_id, name) -> (plaintext, expires_at monotonic)
+_secret_cache: dict[tuple[int | None, int | None, str], tuple[str, float]] = {}
 
+
+@functools.lru_cache(maxsize=1)
 def _get_fernet() -> Fernet:
     """Return a cached Fernet instance using OPENSHRIMP_VAULT_KEY.
 
     The key must be a 32-byte urlsafe base64 value (Fernet.generate_key()).
+    Failures are not cached, so setting the key later still works.
     """
-    global _fernet
-    if _fernet is not None:
-        return _fernet
     raw = os.environ.get(_VAULT_KEY_ENV, "").strip()
     if not raw:
         raise RuntimeError(
@@ -37,9 +43,7 @@ def _get_fernet() -> Fernet:
             "and set it in your environment to enable the credential vault."
         )
     try:
-        key_bytes = raw.encode("utf-8")
-        _fernet = Fernet(key_bytes)
-        return _fernet
+        return Fernet(raw.encode("utf-8"))
     except Exception as e:  # pragma: no cover - defensive
         raise RuntimeError(
             f"{_VAULT_KEY_ENV} must be a valid Fernet key "
@@ -65,7 +69,7 @@ def store_secret(
     f = _get_fernet()
     token = f.encrypt(value.encode("utf-8")).decode("utf-8")
     _ensure_db()
-    with Session(_db.get_engine()) as session:
+    with _db.session_scope() as session:
         now = datetime.now()
         row = session.exec(
             select(Credential).where(
@@ -88,7 +92,7 @@ def store_secret(
         else:
             row.value_encrypted = token
             row.updated_at = now
-        session.commit()
+    _secret_cache.pop((project_id, user_id, name), None)
 
 
 def get_secret(
@@ -98,28 +102,52 @@ def get_secret(
     user_id: int | None = None,
 ) -> str | None:
     """Return the decrypted secret for (project_id, user_id, name), or None."""
+    return get_secrets(project_id=project_id, user_id=user_id, names=[name]).get(name)
+
+
+def get_secrets(
+    *,
+    project_id: int | None,
+    names: Iterable[str],
+    user_id: int | None = None,
+) -> dict[str, str]:
+    """Return {name: decrypted value} for the given names in one query.
+
+    Missing names, and values that no longer decrypt with the current key, are left out.
+    Reads do not write: last_used_at is not touched. Recently read values come from
+    memory (see SECRET_CACHE_TTL); only the rest are queried and decrypted.
+    """
+    now = time.monotonic()
+    secrets: dict[str, str] = {}
+    missing: list[str] = []
+    for name in names:
+        cached = _secret_cache.get((project_id, user_id, name))
+        if cached is not None and cached[1] > now:
+            secrets[name] = cached[0]
+        else:
+            missing.append(name)
+    if not missing:
+        return secrets
     f = _get_fernet()
     _ensure_db()
-    with Session(_db.get_engine()) as session:
-        row = session.exec(
-            select(Credential).where(
+    with _db.session_scope() as session:
+        rows = session.exec(
+            select(Credential.name, Credential.value_encrypted).where(
                 Credential.project_id == project_id,
                 Credential.user_id == user_id,
-                Credential.name == name,
+                Credential.name.in_(missing),
             )
-        ).first()
-        if row is None:
-            return None
+        ).all()
+    expires_at = time.monotonic() + SECRET_CACHE_TTL
+    for name, token in rows:
         try:
-            plaintext = f.decrypt(row.value_encrypted.encode("utf-8")).decode("utf-8")
+            secrets[name] = f.decrypt(token.encode("utf-8")).decode("utf-8")
         except InvalidToken:
             # Corrupted or invalid key — treat as missing
-            return None
-        row.last_used_at = datetime.now()
-        row.updated_at = datetime.now()
-        session.add(row)
-        session.commit()
-        return plaintext
+            continue
+        if SECRET_CACHE_TTL > 0:
+            _secret_cache[(project_id, user_id, name)] = (secrets[name], expires_at)
+    return secrets
 
 
 def list_secret_names(
@@ -129,7 +157,7 @@ def list_secret_names(
 ) -> list[str]:
     """Return all stored secret names for a project/user (values are not returned)."""
     _ensure_db()
-    with Session(_db.get_engine()) as session:
+    with _db.session_scope() as session:
         rows: Iterable[Credential] = session.exec(
             select(Credential).where(
                 Credential.project_id == project_id,
@@ -147,7 +175,7 @@ def delete_secret(
 ) -> bool:
     """Delete a stored secret. Returns True if a row was deleted."""
     _ensure_db()
-    with Session(_db.get_engine()) as session:
+    with _db.session_scope() as session:
         row = session.exec(
             select(Credential).where(
                 Credential.project_id == project_id,
@@ -158,6 +186,6 @@ def delete_secret(
         if row is None:
             return False
         session.delete(row)
-        session.commit()
-        return True
+    _secret_cache.pop((project_id, user_id, name), None)
+    return True
 
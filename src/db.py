@@ -1,14 +1,14 @@
 """PostgreSQL connection and schema init for openshrimp.
 
-Uses psycopg2 and SQLModel; connection params from env (POSTGRES_*).
+One SQLAlchemy engine (postgresql+psycopg2) and pool for the whole process; connection
+params from env (POSTGRES_*).
 """
 
 import os
 from contextlib import contextmanager
 
-import psycopg2
 from sqlalchemy import create_engine
-from sqlmodel import SQLModel
+from sqlmodel import Session, SQLModel
 
 from models import Task, Project, User, DashboardToken, Credential  # noqa: F401 — ensure all tables registered
 
@@ -32,13 +32,14 @@ def _database_url() -> str:
 
 
 def get_connection():
-    """Return a new psycopg2 connection. Caller must close it."""
-    return psycopg2.connect(**_connection_params())
+    """Return a raw psycopg2 connection from the shared engine pool. Caller must close it
+    (which returns it to the pool)."""
+    return get_engine().raw_connection()
 
 
 @contextmanager
 def connection():
-    """Context manager that yields a psycopg2 connection and closes it on exit."""
+    """Context manager that yields a pooled psycopg2 connection and returns it on exit."""
     conn = get_connection()
     try:
         yield conn
@@ -47,17 +48,54 @@ def connection():
 
 
 _engine = None
+_initialized_engine = None  # engine init_db has already run against
 
 
 def get_engine():
     """Return a shared SQLAlchemy engine (postgresql+psycopg2) for SQLModel sessions."""
     global _engine
     if _engine is None:
-        _engine = create_engine(_database_url(), echo=False)
+        _engine = create_engine(
+            _database_url(),
+            echo=False,
+            # API threadpool, bot workers and background writers share this pool
+            pool_size=int(os.environ.get("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "20")),
+            # recycle before server/proxy idle timeouts drop pooled connections
+            pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        )
     return _engine
 
 
+@contextmanager
+def session_scope():
+    """Yield a Session on the shared engine as one transaction: commit on success, roll back on error.
+
+    Wrap multi-step flows in a single scope instead of opening a Session per step.
+    """
+    session = Session(get_engine())
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
 def init_db() -> None:
-    """Create all tables from SQLModel metadata if they do not exist."""
+    """Create all tables and indexes from SQLModel metadata if they do not exist.
+
+    Callers run this before every operation, so the schema is only checked once per engine.
+    """
+    global _initialized_engine
     engine = get_engine()
+    if _initialized_engine is engine:
+        return
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add indexes declared later here
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    _initialized_engine = engine
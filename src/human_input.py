@@ -27,7 +27,8 @@ class PendingQuestion:
     created_at: float = field(default_factory=time.monotonic)
 
 
-# keyed by chat_id
+# keyed by chat_id. Writers take _lock; single lookups read without it (a dict
+# get/contains is atomic under the GIL) since the bot checks on every message.
 _pending: dict[int, PendingQuestion] = {}
 _lock = threading.Lock()
 
@@ -55,8 +56,7 @@ def resolve(chat_id: int, answer: str) -> bool:
 
     Returns True if there was a pending question, False otherwise.
     """
-    with _lock:
-        pq = _pending.get(chat_id)
+    pq = _pending.get(chat_id)
     if pq is None:
         return False
     pq.answer.append(answer)
@@ -66,15 +66,15 @@ def resolve(chat_id: int, answer: str) -> bool:
 
 def has_pending(chat_id: int) -> bool:
     """Return True if there is a pending question for *chat_id*."""
-    with _lock:
-        return chat_id in _pending
+    return chat_id in _pending
 
 
 def get_stale(stale_seconds: float = 300) -> list[PendingQuestion]:
     """Return all pending questions older than *stale_seconds*."""
     cutoff = time.monotonic() - stale_seconds
     with _lock:
-        return [pq for pq in _pending.values() if pq.created_at < cutoff]
+        pending = list(_pending.values())
+    return [pq for pq in pending if pq.created_at < cutoff]
 
 
 def cleanup(chat_id: int) -> None:
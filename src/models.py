@@ -1,7 +1,7 @@
 from sqlmodel import SQLModel, Field
 from enum import Enum
 from datetime import datetime
-from sqlalchemy import Enum as SQLAEnum
+from sqlalchemy import Enum as SQLAEnum, Index
 
 
 class Effort(str, Enum):
@@ -40,6 +40,12 @@ class Priority(str, Enum):
 
 
 
+def _text_enum(enum_cls: type[Enum], **kw) -> SQLAEnum:
+    """Enum stored as VARCHAR + CHECK rather than a Postgres ENUM type, so adding a member
+    needs no ALTER TYPE. Tables created with native ENUM columns keep working unchanged."""
+    return SQLAEnum(enum_cls, native_enum=False, create_constraint=True, **kw)
+
+
 class TaskBase(SQLModel):
     """Shared fields for Task (table) and API create schema. No table."""
 
@@ -48,21 +54,24 @@ class TaskBase(SQLModel):
     assignee_id: int | None = Field(default=None, foreign_key="user.id")
     project_id: int = Field(foreign_key="project.id")
     description: str
-    status: TaskStatus = Field(default=TaskStatus.PENDING)
-    priority: Priority = Field(default=Priority.MEDIUM)
+    status: TaskStatus = Field(default=TaskStatus.PENDING, index=True, sa_type=_text_enum(TaskStatus))
+    priority: Priority = Field(default=Priority.MEDIUM, sa_type=_text_enum(Priority))
     pending_question: str | None = Field(default=None)
     effort: Effort = Field(
         default=Effort.NORMAL,
-        sa_type=SQLAEnum(Effort, values_callable=lambda x: [e.value for e in x]),
+        sa_type=_text_enum(Effort, values_callable=lambda x: [e.value for e in x]),
     )
     chat_id: int | None = Field(default=None)
-    worker_id: str | None = Field(default=None)
+    worker_id: str | None = Field(default=None, index=True)
     scheduled_at: datetime | None = Field(default=None, index=True)
     repeat_interval_seconds: int | None = Field(default=None)
     heartbeat_at: datetime | None = Field(default=None)
 
 
 class Task(TaskBase, table=True):
+    # Dashboard and /tasks filter by user, then optionally by project.
+    __table_args__ = (Index("ix_task_user_id_project_id", "user_id", "project_id"),)
+
     id: int = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -77,6 +86,10 @@ class DashboardToken(SQLModel, table=True):
 
 
 class Credential(SQLModel, table=True):
+    # Every vault lookup filters on all three. Not unique: user/project are nullable and
+    # existing databases may already hold duplicates.
+    __table_args__ = (Index("ix_credential_scope", "project_id", "user_id", "name"),)
+
     id: int = Field(default=None, primary_key=True)
     user_id: int | None = Field(default=None, foreign_key="user.id")
     project_id: int | None = Field(default=None, foreign_key="project.id")
@@ -6,14 +6,41 @@ the user's task description.
 """
 
 from __future__ import annotations
+import functools
 import re
 
-# Each entry: (compiled regex, playbook text)
-_PLAYBOOKS: list[tuple[re.Pattern, str]] = []
+# Playbook texts in registration order; playbook i matches when group "pb<i>" of _UNION does.
+_TEXTS: list[str] = []
+_PATTERNS: list[str] = []
+_UNION: re.Pattern | None = None
+# Lowercase substrings at least one of which appears in any query a playbook matches;
+# None once a playbook is registered without them (prescreen disabled).
+_LITERALS: tuple[str, ...] | None = ()
 
+# Longer queries are matched directly instead of being kept as cache keys.
+_CACHE_MAX_QUERY_CHARS = 2000
 
-def _register(pattern: str, text: str) -> None:
-    _PLAYBOOKS.append((re.compile(pattern, re.IGNORECASE), text.strip()))
+
+@functools.lru_cache(maxsize=512)
+def _detect_cached(query: str) -> str:
+    return _detect(query)
+
+
+def _register(pattern: str, text: str, literals: tuple[str, ...] | None = None) -> None:
+    """Add a playbook. All patterns are scanned together in one combined regex, so a
+    keyword that two playbooks share is only credited to the first one registered.
+
+    *literals*: lowercase substrings, one of which every match of *pattern* contains.
+    Queries containing none of them skip the regex entirely.
+    """
+    global _UNION, _LITERALS
+    _LITERALS = None if literals is None or _LITERALS is None else _LITERALS + literals
+    _PATTERNS.append(pattern)
+    _TEXTS.append(text.strip())
+    _UNION = re.compile(
+        "|".join(f"(?P<pb{i}>{p})" for i, p in enumerate(_PATTERNS)), re.IGNORECASE
+    )
+    _detect_cached.cache_clear()
 
 
 # ── X.com / Twitter ──────────────────────────────────────────────────────────
@@ -34,6 +61,7 @@ Login flow (x.com uses a multi-step form):
 Credentials: search memory for "x.com" or "twitter" credentials before asking the user.
 Cookies are saved automatically — if already logged in from a previous task, navigate directly to x.com and verify.
 """,
+    literals=("x.com", "twitter", "tweet", "post on x"),
 )
 
 # ── Credential memory protocol ────────────────────────────────────────────────
@@ -46,10 +74,27 @@ Before asking the user for credentials:
 2. If found, use them directly — do NOT ask the user.
 3. If the user provides credentials in this task, immediately call memory_add(content="<site> credentials: username=<u> password=<p>", source="credentials:<site>") so they are remembered for future tasks.
 """,
+    literals=("credential", "login", "pass", "username", "sign"),
 )
 
 
 def detect(query: str) -> str:
     """Return all matching playbook sections joined, or empty string if none match."""
-    matched = [text for pattern, text in _PLAYBOOKS if pattern.search(query)]
-    return "\n\n".join(matched)
+    if len(query) <= _CACHE_MAX_QUERY_CHARS:
+        return _detect_cached(query)
+    return _detect(query)
+
+
+def _detect(query: str) -> str:
+    if _UNION is None:
+        return ""
+    if _LITERALS is not None:
+        lowered = query.lower()
+        if not any(lit in lowered for lit in _LITERALS):
+            return ""
+    matched: set[int] = set()
+    for m in _UNION.finditer(query):
+        matched.add(int(m.lastgroup[2:]))
+        if len(matched) == len(_TEXTS):
+            break  # every playbook already matched; skip the rest of the query
+    return "\n\n".join(_TEXTS[i] for i in sorted(matched))
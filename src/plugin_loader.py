@@ -3,10 +3,19 @@
 import importlib.util
 import json
 import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import ModuleType
 
 from langchain_core.tools import BaseTool
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from schemas import PluginManifest
 
 logger = logging.getLogger(__name__)
@@ -16,6 +25,64 @@ PLUGINS_DIR = Path(__file__).resolve().parent / "plugins"
 # Tool name -> list of plugin tags (e.g. "research"); populated by load_plugins().
 TOOL_PLUGIN_TAGS: dict[str, list[str]] = {}
 
+# Manifests are parsed straight from bytes; orjson when installed, else stdlib json.
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Threads importing tool.py files at once. Default 1 (sequential): parallel imports only
+# help when they block on disk, and plugins must not import agent (it is still importing
+# while load_plugins runs, so a worker would wait on it forever).
+PLUGIN_LOAD_WORKERS = max(1, int(os.environ.get("PLUGIN_LOAD_WORKERS", "1")))
+
+# (PLUGINS_DIR st_mtime_ns, sorted subdirectories); adding or removing a plugin directory
+# changes the mtime and triggers a rescan.
+_DISCOVERY_CACHE: tuple[int, list[Path]] | None = None
+
+# Module name -> tool.py st_mtime_ns it was executed from; an edited tool.py is re-executed.
+_LOADED_MTIMES: dict[str, int] = {}
+
+
+def discover_plugin_dirs() -> list[Path]:
+    """Return the sorted subdirectories of PLUGINS_DIR (empty if it does not exist)."""
+    global _DISCOVERY_CACHE
+    try:
+        mtime = PLUGINS_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    if _DISCOVERY_CACHE is None or _DISCOVERY_CACHE[0] != mtime:
+        _DISCOVERY_CACHE = (mtime, sorted(d for d in PLUGINS_DIR.iterdir() if d.is_dir()))
+    return list(_DISCOVERY_CACHE[1])
+
+
+def load_tool_module(plugin_name: str, tool_path: Path) -> ModuleType:
+    """Import a plugin's tool.py as ``plugin_<name>_tool``, reusing the module already in
+    sys.modules while it comes from the same, unchanged file.
+
+    Raises ImportError if no import spec can be built; errors raised by the module propagate.
+    """
+    mod_name = f"plugin_{plugin_name}_tool"
+    mtime = tool_path.stat().st_mtime_ns
+    module = sys.modules.get(mod_name)
+    if (
+        module is not None
+        and getattr(module, "__file__", None) == str(tool_path)
+        and _LOADED_MTIMES.get(mod_name, mtime) == mtime
+    ):
+        return module
+    spec = importlib.util.spec_from_file_location(mod_name, tool_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"failed to create spec for {tool_path}")
+    module = importlib.util.module_from_spec(spec)
+    # Registered before executing, like a regular import, so the module can be found by
+    # name while it runs (dataclasses, pickling, recursive imports).
+    sys.modules[mod_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        sys.modules.pop(mod_name, None)
+        raise
+    _LOADED_MTIMES[mod_name] = mtime
+    return module
+
 
 def load_plugins() -> list[BaseTool]:
     """Discover and load all plugins from plugins directory.
@@ -31,11 +98,12 @@ def load_plugins() -> list[BaseTool]:
         logger.warning(f"Plugins directory does not exist: {PLUGINS_DIR}")
         return tools
 
-    plugin_dirs = sorted([d for d in PLUGINS_DIR.iterdir() if d.is_dir()])
+    plugin_dirs = discover_plugin_dirs()
     if not plugin_dirs:
         logger.warning(f"No plugin directories found in {PLUGINS_DIR}")
         return tools
 
+    candidates: list[tuple[str, PluginManifest, Path]] = []
     for plugin_dir in plugin_dirs:
         plugin_name = plugin_dir.name
         manifest_path = plugin_dir / "manifest.json"
@@ -47,27 +115,35 @@ def load_plugins() -> list[BaseTool]:
             continue
 
         try:
-            with open(manifest_path) as f:
-                manifest_data = json.load(f)
+            manifest_data = _loads(manifest_path.read_bytes())
             manifest = PluginManifest(**manifest_data)
         except Exception as e:
             logger.error(f"Plugin '{plugin_name}': failed to validate manifest: {e}, skipping")
             continue
 
-        # 2. Dynamically import tool.py
         if not tool_path.exists():
             logger.error(f"Plugin '{plugin_name}': tool.py not found, skipping")
             continue
+        candidates.append((plugin_name, manifest, tool_path))
 
+    # 2. Dynamically import tool.py (see PLUGIN_LOAD_WORKERS); results keep directory order
+    def _import(candidate: tuple[str, PluginManifest, Path]) -> tuple[ModuleType | None, Exception | None]:
+        plugin_name, _manifest, tool_path = candidate
         try:
-            spec = importlib.util.spec_from_file_location(f"plugin_{plugin_name}_tool", tool_path)
-            if spec is None or spec.loader is None:
-                logger.error(f"Plugin '{plugin_name}': failed to create spec for tool.py, skipping")
-                continue
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            return load_tool_module(plugin_name, tool_path), None
         except Exception as e:
-            logger.error(f"Plugin '{plugin_name}': failed to import tool.py: {e}, skipping")
+            return None, e
+
+    workers = min(PLUGIN_LOAD_WORKERS, len(candidates))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plugin-load") as pool:
+            imported = list(pool.map(_import, candidates))
+    else:
+        imported = [_import(c) for c in candidates]
+
+    for (plugin_name, manifest, _tool_path), (module, error) in zip(candidates, imported):
+        if error is not None:
+            logger.error(f"Plugin '{plugin_name}': failed to import tool.py: {error}, skipping")
             continue
 
         # 3. Read module-level TOOLS list
@@ -2,18 +2,19 @@
 
 Uses browserless Chrome with pyppeteer-stealth. Core logic lives in src/browser.py.
 Actions: navigate, read, inspect, click, type, press_key, scroll, wait.
+browser_read_many reads several URLs concurrently outside the interactive page.
 """
 
+import os
 import sys
-from pathlib import Path
 
 from langchain_core.tools import tool
 
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
-from browser import execute_action, close_session
+from browser import BROWSER_ACTION_TIMEOUT, execute_action, close_session, read_many
 from schemas import ToolResult
 
 
@@ -67,9 +68,37 @@ def browser(
     return tr.to_string()
 
 
+@tool
+def browser_read_many(urls: list[str]) -> str:
+    """Load several web pages at once and return the text of each.
+
+    Use this instead of repeated browser(navigate) calls when you only need to read a
+    list of URLs (e.g. search results or sources to compare). Pages open in parallel in
+    separate tabs; the interactive browser page is not changed, so use browser() for
+    clicking, typing or logging in.
+
+    Args:
+        urls: Full URLs to read.
+    """
+    parts = []
+    for result in read_many(urls):
+        tr = ToolResult(
+            status="error" if not result.get("ok") else "ok",
+            data=result.get("data", ""),
+            plugin="browser",
+            extra={"url": result.get("url", ""), "title": result.get("title", "")},
+        )
+        parts.append(f"## {result.get('url', '')}\n{tr.to_string()}")
+    return "\n\n".join(parts) or "[browser ERROR] No URLs given."
+
+
 # For telegram_bot / other callers that need cleanup
 def close_browser_session() -> None:
     close_session()
 
 
-TOOLS = [browser]
+# The browser enforces BROWSER_ACTION_TIMEOUT itself; the agent's limit is a backstop.
+browser.metadata = {"timeout": BROWSER_ACTION_TIMEOUT + 30}
+browser_read_many.metadata = {"read_only": True, "timeout": BROWSER_ACTION_TIMEOUT + 30}
+
+TOOLS = [browser, browser_read_many]
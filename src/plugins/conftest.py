@@ -1,10 +1,9 @@
 """Shared pytest fixtures for plugin tests.
 
 Ensures src and repo root are on sys.path. Provides plugin discovery and
-a callable to load a plugin's TOOLS list (cached per plugin name).
+a callable to load a plugin's TOOLS list (modules shared with plugin_loader).
 """
 
-import importlib.util
 import sys
 from pathlib import Path
 
@@ -18,41 +17,32 @@ for path in (SRC_DIR, REPO_ROOT):
     if str(path) not in sys.path:
         sys.path.insert(0, str(path))
 
+from plugin_loader import discover_plugin_dirs, load_tool_module  # noqa: E402 — needs src on sys.path
+
 
 def _discover_plugin_dirs():
     """Plugin dirs that have both manifest.json and tool.py."""
-    if not PLUGINS_DIR.exists():
-        return []
-    return sorted(
+    return [
         d
-        for d in PLUGINS_DIR.iterdir()
-        if d.is_dir() and (d / "manifest.json").exists() and (d / "tool.py").exists()
-    )
+        for d in discover_plugin_dirs()
+        if (d / "manifest.json").exists() and (d / "tool.py").exists()
+    ]
 
 
 plugin_dirs_list = _discover_plugin_dirs()
 
-_plugin_tools_cache = {}
-
 
 def load_plugin_tools(plugin_name: str):
-    """Load and return the TOOLS list for a plugin. Cached per plugin name."""
-    if plugin_name in _plugin_tools_cache:
-        return _plugin_tools_cache[plugin_name]
+    """Load and return the TOOLS list for a plugin.
+
+    Uses plugin_loader's module cache, so a plugin already imported by the agent (or an
+    earlier test) is not executed again unless its tool.py changed.
+    """
     plugin_dir = PLUGINS_DIR / plugin_name
     tool_path = plugin_dir / "tool.py"
     if not tool_path.exists():
         raise FileNotFoundError(f"Plugin '{plugin_name}': tool.py not found")
-    spec = importlib.util.spec_from_file_location(
-        f"plugin_{plugin_name}_tool", tool_path
-    )
-    if spec is None or spec.loader is None:
-        raise RuntimeError(f"Plugin '{plugin_name}': failed to create spec for tool.py")
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    tools = getattr(module, "TOOLS", [])
-    _plugin_tools_cache[plugin_name] = tools
-    return tools
+    return getattr(load_tool_module(plugin_name, tool_path), "TOOLS", [])
 
 
 @pytest.fixture(scope="session")
@@ -63,5 +53,5 @@ def plugin_dirs():
 
 @pytest.fixture(scope="session")
 def load_plugin_tools_fixture():
-    """Return the load_plugin_tools(plugin_name) callable. Cached per plugin."""
+    """Return the load_plugin_tools(plugin_name) callable. Modules are cached per tool.py version."""
     return load_plugin_tools
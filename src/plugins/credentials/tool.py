@@ -7,15 +7,15 @@ OPENSHRIMP_VAULT_KEY.
 
 from __future__ import annotations
 
+import os
 import sys
-from pathlib import Path
 
 from langchain_core.tools import tool
 
 # Ensure src/ is on sys.path when loaded via plugin loader
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
 import credentials as cred_vault
 import task_service
@@ -141,5 +141,8 @@ def delete_credential(name: str) -> str:
     )
 
 
+get_credential.metadata = {"read_only": True}
+list_credentials.metadata = {"read_only": True}
+
 TOOLS = [store_credential, get_credential, list_credentials, delete_credential]
 
@@ -6,6 +6,7 @@ is not found, use write_file to replace the whole file. run_command runs termina
 the project workspace as the current working directory.
 """
 
+import os
 import re
 import shutil
 import subprocess
@@ -15,9 +16,9 @@ from pathlib import Path
 from langchain_core.tools import tool
 
 # Add src directory to path so we can import schemas when run standalone or via plugin loader
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
 from schemas import ToolResult
 
@@ -269,6 +270,11 @@ def run_command(
         return _err(str(e))
 
 
+read_file.metadata = {"read_only": True}
+list_directory.metadata = {"read_only": True}
+# Bounded by its own timeout_seconds argument
+run_command.metadata = {"timeout": None}
+
 TOOLS = [
     read_file,
     write_file,
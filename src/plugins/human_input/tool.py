@@ -11,18 +11,18 @@ Guards:
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import os
 import sys
 import threading
-from pathlib import Path
 
 from langchain_core.tools import tool
 
 # Ensure src/ is on sys.path when loaded via plugin loader
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
 import human_input as _human_input
 import task_service
@@ -63,6 +63,22 @@ def _cleanup_ask_count() -> None:
                 del _ask_count[tid]
 
 
+@functools.lru_cache(maxsize=1)
+def _evaluator_llm():
+    """Gatekeeper model, configured from env once per process; None without an API key."""
+    api_key = os.environ.get("OPENROUTER_API_KEY") or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    from langchain_openrouter import ChatOpenRouter
+
+    return ChatOpenRouter(
+        model=os.environ.get("OPENROUTER_EVALUATOR_MODEL", os.environ.get("OPENROUTER_MODEL", "deepseek/deepseek-v3.2")),
+        temperature=0,
+        api_key=api_key,
+        timeout=15_000,  # 15 s — fast gate check
+    )
+
+
 def _should_ask_user(question: str) -> tuple[bool, str]:
     """Use a fast LLM call to decide whether the question is worth bothering the user.
 
@@ -72,20 +88,12 @@ def _should_ask_user(question: str) -> tuple[bool, str]:
     On any error, fails open (returns True, "").
     """
     try:
-        import os as _os
-        api_key = _os.environ.get("OPENROUTER_API_KEY") or _os.environ.get("OPENAI_API_KEY")
-        if not api_key:
+        llm = _evaluator_llm()
+        if llm is None:
             return True, ""
 
-        from langchain_openrouter import ChatOpenRouter
         from langchain_core.messages import HumanMessage
 
-        llm = ChatOpenRouter(
-            model=_os.environ.get("OPENROUTER_EVALUATOR_MODEL", _os.environ.get("OPENROUTER_MODEL", "deepseek/deepseek-v3.2")),
-            temperature=0,
-            api_key=api_key,
-            timeout=15_000,  # 15 s — fast gate check
-        )
         eval_prompt = (
             "You are a gatekeeper deciding whether an AI research agent should ask a human user a question.\n\n"
             "Approve (ALLOW) only if:\n"
@@ -115,6 +123,15 @@ def _should_ask_user(question: str) -> tuple[bool, str]:
         return True, ""
 
 
+def _log_send_error(fut) -> None:
+    """Done-callback for the question send so failures are still observed."""
+    if fut.cancelled():
+        return
+    exc = fut.exception()
+    if exc is not None:
+        logger.warning("ask_human failed to send question: %r", exc)
+
+
 @tool
 def ask_human(question: str, timeout_seconds: int = 600) -> str:
     """Ask the Telegram user a question and wait for their reply.
@@ -182,13 +199,15 @@ def ask_human(question: str, timeout_seconds: int = 600) -> str:
 
     pending = _human_input.register(chat_id, question, task_id)
 
+    # Don't block on the send; the reply wait below starts immediately.
     try:
-        asyncio.run_coroutine_threadsafe(
+        send_fut = asyncio.run_coroutine_threadsafe(
             bot_app.bot.send_message(chat_id=chat_id, text=f"❓ {question}"),
             loop,
-        ).result(timeout=10)
-    except Exception:
-        pass  # already sent to user if possible; don't abort
+        )
+        send_fut.add_done_callback(_log_send_error)
+    except Exception as exc:
+        logger.warning("ask_human could not schedule question for task #%s: %s", task_id, exc)
 
     answered = pending.event.wait(timeout=timeout_seconds)
 
@@ -211,4 +230,7 @@ def ask_human(question: str, timeout_seconds: int = 600) -> str:
     return pending.answer[0]
 
 
+# Waits for the user for up to timeout_seconds by design
+ask_human.metadata = {"timeout": None}
+
 TOOLS = [ask_human]
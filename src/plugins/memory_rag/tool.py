@@ -6,7 +6,6 @@ Uses sentence-transformers/all-minilm-l6-v2 by default (override via EMBEDDING_M
 
 import os
 import sys
-from pathlib import Path
 from urllib.parse import quote_plus
 
 from langchain_core.tools import tool
@@ -14,9 +13,9 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import PGVector
 
 # Add src directory to path so we can import schemas when run standalone
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
 from schemas import ToolResult
 
@@ -124,6 +123,33 @@ def memory_add(content: str, source: str = "") -> str:
         return result.to_string()
 
 
+def add_many(items: list[tuple[str, str]]) -> int:
+    """Store several (content, source) pairs with a single embeddings request.
+
+    Not an agent tool: the agent uses it to flush batched auto-saves of research
+    results. Empty contents are skipped; returns how many texts were stored.
+    """
+    user_id = _get_user_id()
+    texts, metadatas = [], []
+    for content, source in items:
+        text = (content or "").strip()
+        if not text:
+            continue
+        metadata = {} if not (source or "").strip() else {"source": source.strip()}
+        if user_id is not None:
+            metadata["user_id"] = user_id
+        texts.append(text)
+        metadatas.append(metadata)
+    if not texts:
+        return 0
+    _get_vector_store().add_texts(texts, metadatas=metadatas)
+    return len(texts)
+
+
+# Lets callers holding only the tool object find the batch variant.
+memory_add.metadata = {"add_many": add_many}
+
+
 @tool
 def memory_retrieve(query: str, top_k: int = 5) -> str:
     """Search long-term memory for relevant past information.
@@ -172,4 +198,6 @@ def memory_retrieve(query: str, top_k: int = 5) -> str:
         return result.to_string()
 
 
+memory_retrieve.metadata = {"read_only": True}
+
 TOOLS = [memory_add, memory_retrieve]
@@ -8,14 +8,13 @@ from __future__ import annotations
 import os
 import sys
 from datetime import datetime, timedelta
-from pathlib import Path
 
 from langchain_core.tools import tool
 
 # Ensure src/ is on sys.path when loaded via plugin loader
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
 import task_service
 import telegram_state
@@ -311,4 +310,7 @@ def update_task(task_id: int, status: str | None = None, notes: str | None = Non
         return _err(str(e))
 
 
+list_tasks.metadata = {"read_only": True}
+get_task.metadata = {"read_only": True}
+
 TOOLS = [create_task, schedule_followup_task, list_tasks, get_task, update_task_status, update_task]
@@ -0,0 +1,40 @@
+"""Plugin-specific tests for telegram_notify. Use fixtures from plugins/conftest.py."""
+
+import sys
+
+
+def _module(load_plugin_tools_fixture):
+    load_plugin_tools_fixture("telegram_notify")
+    return sys.modules["plugin_telegram_notify_tool"]
+
+
+def test_pack_keeps_every_text_within_telegram_limit(load_plugin_tools_fixture):
+    mod = _module(load_plugin_tools_fixture)
+    limit = mod.TELEGRAM_MAX_MESSAGE_CHARS
+    texts = mod._pack(["a" * 3000, "b" * 3000, "c" * (limit + 10), "d"])
+    assert all(len(t) <= limit for t in texts)
+    assert texts[0] == "a" * 3000
+    assert texts[1] == "b" * 3000
+    assert texts[2] == "c" * limit
+    assert texts[3] == "c" * 10 + "\n\n" + "d"
+
+
+def test_failed_send_is_reported_by_next_call(load_plugin_tools_fixture, monkeypatch):
+    mod = _module(load_plugin_tools_fixture)
+
+    class _Bot:
+        def send_message(self, **kwargs):
+            raise RuntimeError("message is too long")
+
+    class _App:
+        bot = _Bot()
+
+    monkeypatch.setattr(mod.asyncio, "run_coroutine_threadsafe", lambda coro, loop: coro)
+    mod._send_batch(7, _App(), None, ["hello"])
+    monkeypatch.setattr(mod.telegram_state, "get_chat_id", lambda: 7)
+    monkeypatch.setattr(mod.telegram_state, "get_bot_app", lambda: _App())
+    monkeypatch.setattr(mod.telegram_state, "get_loop", lambda: object())
+    monkeypatch.setattr(mod, "_ensure_worker", lambda: None)
+    monkeypatch.setattr(mod, "_queue", mod.queue.Queue())
+    assert "failed to send" in mod.telegram_send.invoke({"message": "next"})
+    assert mod.telegram_send.invoke({"message": "again"}) == "[telegram_notify] queued"
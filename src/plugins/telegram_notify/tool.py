@@ -5,27 +5,128 @@ This is a no-op when not running inside a Telegram bot context.
 """
 
 import asyncio
+import logging
+import os
+import queue
 import sys
-from pathlib import Path
+import threading
+import time
 
 from langchain_core.tools import tool
 
 # Add src directory to path so we can import telegram_state when run via plugin loader
-_src = Path(__file__).resolve().parents[2]
-if str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
+_src = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _src not in sys.path:
+    sys.path.insert(0, _src)
 
 import telegram_state
 
 PLUGIN_NAME = "telegram_notify"
 
+logger = logging.getLogger(__name__)
+
+# Messages for the same chat arriving within this window go out as one send_message.
+COALESCE_WINDOW_SECONDS = 0.25
+SEND_TIMEOUT_SECONDS = 10
+# Telegram rejects longer message texts.
+TELEGRAM_MAX_MESSAGE_CHARS = 4096
+_SEPARATOR = "\n\n"
+
+_FLUSH = object()
+_queue: queue.Queue = queue.Queue()
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+# chat_id -> last send error since telegram_send was last called for that chat
+_failures: dict[int, str] = {}
+
+
+def _pack(messages: list[str]) -> list[str]:
+    """Join messages into texts of at most TELEGRAM_MAX_MESSAGE_CHARS.
+
+    A message is only appended to the current text if the result still fits; a single
+    message longer than the limit is split into limit-sized pieces.
+    """
+    texts: list[str] = []
+    current = ""
+    for message in messages:
+        for start in range(0, len(message), TELEGRAM_MAX_MESSAGE_CHARS):
+            piece = message[start : start + TELEGRAM_MAX_MESSAGE_CHARS]
+            if current and len(current) + len(_SEPARATOR) + len(piece) <= TELEGRAM_MAX_MESSAGE_CHARS:
+                current += _SEPARATOR + piece
+            else:
+                if current:
+                    texts.append(current)
+                current = piece
+    if current:
+        texts.append(current)
+    return texts
+
+
+def _send_batch(chat_id: int, bot_app, loop, messages: list[str]) -> None:
+    for text in _pack(messages):
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                bot_app.bot.send_message(chat_id=chat_id, text=text),
+                loop,
+            )
+            future.result(timeout=SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("telegram_send failed for chat %s: %r", chat_id, e)
+            _failures[chat_id] = repr(e)
+
+
+def _drain() -> None:
+    """Worker loop: collect messages for COALESCE_WINDOW_SECONDS, then send one per chat."""
+    while True:
+        item = _queue.get()
+        batches: dict[tuple, list[str]] = {}
+        flushed: list[threading.Event] = []
+        deadline = time.monotonic() + COALESCE_WINDOW_SECONDS
+        while True:
+            if isinstance(item, tuple) and item[0] is _FLUSH:
+                flushed.append(item[1])
+                break
+            chat_id, bot_app, loop, message = item
+            batches.setdefault((chat_id, id(bot_app), id(loop)), [bot_app, loop]).append(message)
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = _queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+        for (chat_id, _, _), (bot_app, loop, *messages) in batches.items():
+            _send_batch(chat_id, bot_app, loop, messages)
+        for event in flushed:
+            event.set()
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_drain, name="telegram-notify", daemon=True)
+            _worker.start()
+
+
+def flush(timeout: float = SEND_TIMEOUT_SECONDS) -> bool:
+    """Send everything queued so far; returns False if it did not finish within timeout."""
+    _ensure_worker()
+    done = threading.Event()
+    _queue.put((_FLUSH, done))
+    return done.wait(timeout)
+
 
 @tool
 def telegram_send(message: str) -> str:
     """Send a proactive update message to the Telegram user while still working.
 
     Use this to share intermediate findings or let the user know what you are doing.
-    This is a no-op if not running inside a Telegram bot context.
+    This is a no-op if not running inside a Telegram bot context. The message is
+    queued and delivered in the background, so this returns immediately; a failed
+    delivery is reported by the next telegram_send call.
 
     Args:
         message: The message to send to the user.
@@ -37,15 +138,14 @@ def telegram_send(message: str) -> str:
     if chat_id is None or bot_app is None or loop is None:
         return "[telegram_notify] No active Telegram session — message not sent."
 
-    try:
-        future = asyncio.run_coroutine_threadsafe(
-            bot_app.bot.send_message(chat_id=chat_id, text=message),
-            loop,
-        )
-        future.result(timeout=10)
-        return f"[telegram_notify] Message sent to chat {chat_id}."
-    except Exception as e:
-        return f"[telegram_notify] Failed to send message: {e!r}"
+    _ensure_worker()
+    _queue.put((chat_id, bot_app, loop, message))
+    error = _failures.pop(chat_id, None)
+    if error is not None:
+        return f"[telegram_notify] queued; an earlier message failed to send: {error}"
+    return "[telegram_notify] queued"
+
 
+telegram_send.metadata = {"flush": flush}
 
 TOOLS = [telegram_send]
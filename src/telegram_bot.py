@@ -39,7 +39,7 @@ import db as _db
 import human_input as _human_input
 import task_service
 import telegram_state
-from agent import run_agent
+from agent import flush_notifications, run_agent
 from models import Project, TaskStatus, User
 from playbooks import detect as _detect_playbook
 
@@ -421,6 +421,8 @@ def _run_agent_in_thread(
     else:
         answer = BOT_PREFIX + f"✅ Task #{task_id} completed:\n\n{body}\n\n---\nTask: {task_title}"
 
+    # The agent's own telegram_send updates are queued; let them arrive before the answer.
+    flush_notifications()
     try:
         chunks = _chunk_text(answer)
         for chunk in chunks:
@@ -1,13 +1,21 @@
-"""Thread-local holder for the active Telegram session context.
+"""Context-local holder for the active Telegram session context.
 
 Each worker thread (one per user request) stores its own chat_id, bot app,
 event loop, and task_id so that tools can send messages back to the right chat
-without passing context through every call frame.
+without passing context through every call frame. Values are ContextVars, so
+they also follow the agent into asyncio tasks and tool threads started with
+asyncio.to_thread / run_in_executor (both copy the current context).
 """
 
-import threading
+from contextvars import ContextVar
 
-_local = threading.local()
+_chat_id: ContextVar[int | None] = ContextVar("chat_id", default=None)
+_bot_app: ContextVar = ContextVar("bot_app", default=None)
+_loop: ContextVar = ContextVar("loop", default=None)
+_task_id: ContextVar[int | None] = ContextVar("task_id", default=None)
+_human_user_id: ContextVar[int | None] = ContextVar("human_user_id", default=None)
+_agent_user_id: ContextVar[int | None] = ContextVar("agent_user_id", default=None)
+_telegram_user_id: ContextVar[int | None] = ContextVar("telegram_user_id", default=None)
 
 
 def set_context(
@@ -19,46 +27,46 @@ def set_context(
     agent_user_id: int | None = None,
     telegram_user_id: int | None = None,
 ) -> None:
-    """Store Telegram session state for the current thread."""
-    _local.chat_id = chat_id
-    _local.bot_app = bot_app
-    _local.loop = loop
-    _local.task_id = task_id
-    _local.human_user_id = human_user_id
-    _local.agent_user_id = agent_user_id
-    _local.telegram_user_id = telegram_user_id
+    """Store Telegram session state for the current thread (its current context)."""
+    _chat_id.set(chat_id)
+    _bot_app.set(bot_app)
+    _loop.set(loop)
+    _task_id.set(task_id)
+    _human_user_id.set(human_user_id)
+    _agent_user_id.set(agent_user_id)
+    _telegram_user_id.set(telegram_user_id)
 
 
 def get_chat_id() -> int | None:
     """Return the chat_id for the current thread, or None if not set."""
-    return getattr(_local, "chat_id", None)
+    return _chat_id.get()
 
 
 def get_bot_app():
     """Return the bot Application for the current thread, or None if not set."""
-    return getattr(_local, "bot_app", None)
+    return _bot_app.get()
 
 
 def get_loop():
     """Return the asyncio event loop for the current thread, or None if not set."""
-    return getattr(_local, "loop", None)
+    return _loop.get()
 
 
 def get_task_id() -> int | None:
     """Return the DB task_id for the current thread, or None if not set."""
-    return getattr(_local, "task_id", None)
+    return _task_id.get()
 
 
 def get_human_user_id() -> int | None:
     """Return the human DB user_id for the current thread, or None if not set."""
-    return getattr(_local, "human_user_id", None)
+    return _human_user_id.get()
 
 
 def get_agent_user_id() -> int | None:
     """Return the agent DB user_id for the current thread, or None if not set."""
-    return getattr(_local, "agent_user_id", None)
+    return _agent_user_id.get()
 
 
 def get_telegram_user_id() -> int | None:
     """Return the Telegram user_id for the current thread, or None if not set."""
-    return getattr(_local, "telegram_user_id", None)
+    return _telegram_user_id.get()
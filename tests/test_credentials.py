@@ -0,0 +1,55 @@
+"""Unit tests for the credential vault (store, batch lookup, read-only reads, read cache)."""
+
+import pytest
+from cryptography.fernet import Fernet
+from sqlmodel import Session, select
+
+import credentials
+from models import Credential
+
+
+@pytest.fixture
+def vault(in_memory_engine, monkeypatch):
+    monkeypatch.setenv("OPENSHRIMP_VAULT_KEY", Fernet.generate_key().decode())
+    credentials._get_fernet.cache_clear()
+    credentials._secret_cache.clear()
+    yield in_memory_engine
+    credentials._get_fernet.cache_clear()
+    credentials._secret_cache.clear()
+
+
+def test_get_secrets_returns_only_existing_names(vault, seed_user_project):
+    user_id, project_id = seed_user_project
+    credentials.store_secret(project_id=project_id, user_id=user_id, name="a", value="1")
+    credentials.store_secret(project_id=project_id, user_id=user_id, name="b", value="2")
+    credentials.store_secret(project_id=None, user_id=user_id, name="c", value="3")
+
+    found = credentials.get_secrets(project_id=project_id, user_id=user_id, names=["a", "b", "c", "missing"])
+
+    assert found == {"a": "1", "b": "2"}
+    assert credentials.get_secret(project_id=project_id, user_id=user_id, name="missing") is None
+
+
+def test_get_secret_does_not_write(vault, seed_user_project):
+    user_id, project_id = seed_user_project
+    credentials.store_secret(project_id=project_id, user_id=user_id, name="token", value="s3cret")
+    with Session(vault) as session:
+        before = session.exec(select(Credential.updated_at, Credential.last_used_at)).one()
+
+    assert credentials.get_secret(project_id=project_id, user_id=user_id, name="token") == "s3cret"
+
+    with Session(vault) as session:
+        assert session.exec(select(Credential.updated_at, Credential.last_used_at)).one() == before
+
+
+def test_store_and_delete_invalidate_cached_secret(vault, seed_user_project):
+    user_id, project_id = seed_user_project
+    scope = {"project_id": project_id, "user_id": user_id, "name": "token"}
+    credentials.store_secret(value="old", **scope)
+    assert credentials.get_secret(**scope) == "old"
+
+    credentials.store_secret(value="new", **scope)
+    assert credentials.get_secret(**scope) == "new"
+
+    assert credentials.delete_secret(**scope) is True
+    assert credentials.get_secret(**scope) is None
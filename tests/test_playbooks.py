@@ -0,0 +1,21 @@
+"""Unit tests for playbooks.detect (keyword matching and ordering)."""
+
+import playbooks
+
+
+def _headers(text: str) -> list[str]:
+    return [line for line in text.splitlines() if line.startswith("[")]
+
+
+def test_detect_returns_empty_without_keywords():
+    assert playbooks.detect("summarize the latest rust release notes") == ""
+
+
+def test_detect_matches_whole_words_only():
+    assert playbooks.detect("read the passage about compasses") == ""
+    assert _headers(playbooks.detect("I forgot my PASSWORD")) == ["[Credential Protocol]"]
+
+
+def test_detect_joins_matches_in_registration_order():
+    result = playbooks.detect("sign in and then post a tweet")
+    assert _headers(result) == ["[X.com Playbook]", "[Credential Protocol]"]